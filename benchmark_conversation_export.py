@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Benchmark for langgraph_conversation_export.py on a synthetic chatbot.db.
+
+Generates a database in the backends' format (SqliteSaver with MessageStateSerializer):
+each thread has --checkpoints checkpoints whose message lists grow to --messages messages
+in the latest one. Then exports it to JSONL and Parquet and imports both exports into
+fresh databases. Each operation runs in its own child process, so peak RSS is per operation.
+The default of 640 messages per thread seals 10 chunks of 64 messages in the latest state,
+so chunk encoding and decoding are part of the timings; shorter threads are all tail.
+
+Usage:
+    python benchmark_conversation_export.py
+    python benchmark_conversation_export.py --threads 1000 --checkpoints 20 --messages 640 --dir /tmp/export-bench
+"""
+import os
+import sys
+import json
+import uuid
+import sqlite3
+import argparse
+import resource
+import tempfile
+import subprocess
+from datetime import datetime, timezone
+from langchain_core.messages import HumanMessage, AIMessage
+from langgraph.checkpoint.base import empty_checkpoint
+from langgraph.checkpoint.base.id import uuid6
+from langgraph.checkpoint.sqlite import SqliteSaver
+from langgraph_message_state import append_messages, MessageStateSerializer
+
+INSERT_QUERY = (
+    "INSERT INTO checkpoints "
+    "(thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata) "
+    "VALUES (?, '', ?, ?, ?, ?, ?)"
+)
+
+def make_turn(i):
+    return [
+        HumanMessage(content=f"Question {i}: " + "lorem ipsum " * 20, id=str(uuid.uuid4())),
+        AIMessage(content=f"Answer {i}: " + "dolor sit amet " * 40, id=str(uuid.uuid4())),
+    ]
+
+def generate(db_path, threads, checkpoints, messages, batch_size=100):
+    conn = sqlite3.connect(db_path)
+    checkpointer = SqliteSaver(conn, serde=MessageStateSerializer(use_cache=False))
+    checkpointer.setup()
+    turns_per_checkpoint = max(messages // 2 // checkpoints, 1)
+    rows = []
+    for t in range(threads):
+        state, parent_id, version = [], None, None
+        for step in range(checkpoints):
+            turns = turns_per_checkpoint if step < checkpoints - 1 else max(messages // 2 - turns_per_checkpoint * step, 1)
+            for i in range(turns):
+                state = append_messages(state, make_turn(i))
+            version = checkpointer.get_next_version(version, None)
+            checkpoint = empty_checkpoint()
+            checkpoint["id"] = str(uuid6(clock_seq=step))
+            checkpoint["ts"] = datetime.now(timezone.utc).isoformat()
+            checkpoint["channel_values"] = {"messages": state}
+            checkpoint["channel_versions"] = {"messages": version}
+            type_, blob = checkpointer.serde.dumps_typed(checkpoint)
+            metadata = checkpointer.jsonplus_serde.dumps({"source": "loop", "step": step, "parents": {}})
+            rows.append((f"thread-{t}", checkpoint["id"], parent_id, type_, blob, metadata))
+            parent_id = checkpoint["id"]
+        if len(rows) >= batch_size * checkpoints:
+            with conn:
+                conn.executemany(INSERT_QUERY, rows)
+            rows = []
+    if rows:
+        with conn:
+            conn.executemany(INSERT_QUERY, rows)
+    conn.close()
+
+def peak_rss_mb():
+    """
+    Peak RSS of this process in MB. ru_maxrss keeps the parent's peak from before exec
+    (here, the database generation), so on Linux the per-process VmHWM is used instead.
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss / 1024 / 1024 if sys.platform == "darwin" else maxrss / 1024
+
+def run_operation(operation, *paths):
+    """Run one export/import in a child process; return its stats and peak RSS in MB."""
+    process = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "_run", operation, *paths], stdout=subprocess.PIPE
+    )
+    if process.returncode != 0:
+        raise RuntimeError(f"{operation} {' '.join(paths)} failed with exit code {process.returncode}")
+    stats = json.loads(process.stdout)
+    return stats, stats.pop("peak_rss_mb")
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "_run":
+        from langgraph_conversation_export import export_conversations, import_conversations
+        operation, source, target = sys.argv[2:5]
+        stats = export_conversations(source, target) if operation == "export" else import_conversations(target, source)
+        print(json.dumps({**stats, "peak_rss_mb": peak_rss_mb()}))
+        return
+
+    parser = argparse.ArgumentParser(description="Export/import throughput and peak memory on a synthetic chatbot.db.")
+    parser.add_argument("--threads", type=int, default=500)
+    parser.add_argument("--checkpoints", type=int, default=20, help="Checkpoints per thread")
+    parser.add_argument("--messages", type=int, default=640, help="Messages in each thread's latest checkpoint")
+    parser.add_argument("--dir", help="Working directory for the databases and exports (default: a temporary directory)")
+    args = parser.parse_args()
+
+    work_dir = args.dir or tempfile.mkdtemp(prefix="export-bench-")
+    os.makedirs(work_dir, exist_ok=True)
+    db_path = os.path.join(work_dir, "chatbot.db")
+    if not os.path.exists(db_path):
+        generate(db_path, args.threads, args.checkpoints, args.messages)
+    print(f"{db_path}: {os.path.getsize(db_path) / 1e6:.0f} MB, {args.threads} threads x {args.checkpoints} checkpoints, {args.messages} messages in the latest state")
+
+    print(f"{'operation':<22}{'seconds':>9}{'threads/s':>11}{'MB/s':>8}{'output MB':>11}{'peak RSS MB':>13}")
+    for fmt in ("jsonl", "parquet"):
+        export_path = os.path.join(work_dir, f"backup.{fmt}")
+        restored_path = os.path.join(work_dir, f"restored-{fmt}.db")
+        for path in (export_path, restored_path):
+            if os.path.exists(path):
+                os.remove(path)
+        for operation, source, target, output in [
+            ("export", db_path, export_path, export_path),
+            ("import", export_path, restored_path, restored_path),
+        ]:
+            stats, peak_rss = run_operation(operation, source, target)
+            print(
+                f"{operation + ' ' + fmt:<22}{stats['seconds']:>9.1f}{stats['threads_per_second']:>11,.0f}"
+                f"{stats['mb_per_second']:>8.0f}{os.path.getsize(output) / 1e6:>11.0f}{peak_rss:>13.0f}"
+            )
+
+if __name__ == "__main__":
+    main()
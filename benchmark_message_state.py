@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for per-turn message state overhead as a thread grows.
+Compares add_messages with the stock serializer against append_messages with
+MessageStateSerializer (langgraph_message_state.py):
+
+- reducer: the two reducer calls of a chat turn (human message, then AI reply), starting
+  from the state a checkpoint load returns: a plain list for add_messages, a chunked
+  MessageList for append_messages
+- turn: a full chatbot.invoke() with SqliteSaver and a fake LLM, so checkpoint
+  load/store costs are included
+- warm: the thread's chunks are already in the process-wide chunk cache, as for every
+  turn after the first one of a thread in a running server
+- cold: the chunk cache is cleared before each turn, as for the first turn of a thread
+  after a restart (or once its chunks were evicted)
+
+Usage:
+    python benchmark_message_state.py
+    python benchmark_message_state.py --lengths 100 1000 10000 --repeat 20
+"""
+import time
+import uuid
+import sqlite3
+import argparse
+from typing import TypedDict, Annotated
+from langchain_core.messages import BaseMessage, HumanMessage, AIMessage
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langgraph.graph import StateGraph, START, END
+from langgraph.graph.message import add_messages
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from langgraph.checkpoint.sqlite import SqliteSaver
+import langgraph_message_state
+from langgraph_message_state import append_messages, MessageStateSerializer
+
+def make_history(length):
+    history = []
+    for i in range(length // 2):
+        history.append(HumanMessage(content=f"Question {i}: " + "lorem ipsum " * 20, id=str(uuid.uuid4())))
+        history.append(AIMessage(content=f"Answer {i}: " + "dolor sit amet " * 40, id=str(uuid.uuid4())))
+    return history
+
+def loaded_state(reducer, serde, history):
+    """The messages value as a checkpoint load would hand it to the reducer."""
+    state = reducer([], history)
+    return serde.loads_typed(serde.dumps_typed(state))
+
+def time_reducer(reducer, serde, history, repeat):
+    state = loaded_state(reducer, serde, history)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        updated = reducer(state, [HumanMessage(content="next question")])
+        updated = reducer(updated, [AIMessage(content="next answer")])
+    return (time.perf_counter() - start) / repeat * 1000
+
+def build_chatbot(reducer, serde):
+    class ChatState(TypedDict):
+        messages: Annotated[list[BaseMessage], reducer]
+
+    llm = GenericFakeChatModel(messages=(AIMessage(content="next answer") for _ in iter(int, 1)))
+
+    def chat_node(state: ChatState) -> ChatState:
+        # Only the last message is sent so the fake LLM does not dominate the timing
+        return {'messages': [llm.invoke(state['messages'][-1:])]}
+
+    graph = StateGraph(ChatState)
+    graph.add_node('chat_node', chat_node)
+    graph.add_edge(START, 'chat_node')
+    graph.add_edge('chat_node', END)
+    conn = sqlite3.connect(database=':memory:', check_same_thread=False)
+    return graph.compile(checkpointer=SqliteSaver(conn=conn, serde=serde))
+
+def time_turn(reducer, serde, history, repeat, cold=False):
+    chatbot = build_chatbot(reducer, serde)
+    config = {'configurable': {'thread_id': 'benchmark'}}
+    chatbot.update_state(config, {'messages': history})
+    chatbot.invoke({'messages': [HumanMessage(content="warm-up")]}, config=config)
+    elapsed = 0.0
+    for _ in range(repeat):
+        if cold:
+            langgraph_message_state.clear_chunk_cache()
+        start = time.perf_counter()
+        chatbot.invoke({'messages': [HumanMessage(content="next question")]}, config=config)
+        elapsed += time.perf_counter() - start
+    return elapsed / repeat * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-turn message state overhead by thread length.")
+    parser.add_argument("--lengths", type=int, nargs="+", default=[100, 1000, 5000, 10000])
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    stock, chunked = JsonPlusSerializer(), MessageStateSerializer()
+    print(f"{'messages':>10}{'add reducer':>15}{'append reducer':>18}{'add turn':>12}{'append turn warm':>20}{'append turn cold':>20}")
+    for length in args.lengths:
+        history = make_history(length)
+        print(
+            f"{length:>10}"
+            f"{time_reducer(add_messages, stock, history, args.repeat):>12.3f} ms"
+            f"{time_reducer(append_messages, chunked, history, args.repeat):>15.3f} ms"
+            f"{time_turn(add_messages, stock, history, args.repeat):>9.1f} ms"
+            f"{time_turn(append_messages, chunked, history, args.repeat):>17.1f} ms"
+            f"{time_turn(append_messages, chunked, history, args.repeat, cold=True):>17.1f} ms"
+        )
+
+if __name__ == "__main__":
+    main()
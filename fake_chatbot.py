@@ -0,0 +1,40 @@
+"""
+Test helper: a chatbot graph shaped like the backends' graphs, driven by a fake LLM,
+so tests can run offline against any checkpointer.
+"""
+from itertools import count
+from typing import TypedDict, Annotated
+from langchain_core.messages import BaseMessage, AIMessage
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langgraph.graph import StateGraph, START, END
+from langgraph.graph.message import add_messages
+from langgraph.prebuilt import ToolNode, tools_condition
+
+def fake_llm(content="hello there"):
+    # A fresh AIMessage per call: a reused message object keeps the id assigned on its
+    # first run, so every later reply would replace the earlier one in the thread.
+    return GenericFakeChatModel(messages=(AIMessage(content=content) for _ in count()))
+
+def build_fake_chatbot(checkpointer=None, llm=None, tools=None, reducer=add_messages):
+    """
+    Compile START -> chat_node -> END, or a chat_node <-> tools loop when tools are given.
+    llm defaults to fake_llm(); reducer is the messages reducer of the state.
+    """
+    llm = llm or fake_llm()
+
+    class ChatState(TypedDict):
+        messages: Annotated[list[BaseMessage], reducer]
+
+    def chat_node(state: ChatState) -> ChatState:
+        return {'messages': [llm.invoke(state['messages'])]}
+
+    graph = StateGraph(ChatState)
+    graph.add_node('chat_node', chat_node)
+    graph.add_edge(START, 'chat_node')
+    if tools:
+        graph.add_node('tools', ToolNode(tools))
+        graph.add_conditional_edges('chat_node', tools_condition)
+        graph.add_edge('tools', 'chat_node')
+    else:
+        graph.add_edge('chat_node', END)
+    return graph.compile(checkpointer=checkpointer)
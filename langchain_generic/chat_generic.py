@@ -1,10 +1,17 @@
 import os
+import json
 from openai import OpenAI
 from dotenv import load_dotenv
-from typing import Any, List, Optional, Mapping, AsyncIterator, Iterator
+from typing import Any, List, Optional, Mapping, AsyncIterator, Iterator, Sequence, Union, Callable
 from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.language_models import LanguageModelInput
 from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, ToolMessage, AIMessageChunk
+from langchain_core.messages.tool import tool_call_chunk
 from langchain_core.outputs import ChatGeneration, ChatResult, ChatGenerationChunk
+from langchain_core.output_parsers.openai_tools import parse_tool_call, make_invalid_tool_call
+from langchain_core.runnables import Runnable
+from langchain_core.tools import BaseTool
+from langchain_core.utils.function_calling import convert_to_openai_tool
 
 load_dotenv()
 
@@ -24,7 +31,12 @@ def generate_response_with_chat_completion(
     presence_penalty = 0.0, 
     logprobs = None, 
     seed = None,
-    stream=False):
+    stop = None,
+    tools = None,
+    tool_choice = None,
+    parallel_tool_calls = None,
+    stream=False,
+    raw_response=False):
 
     request_kwargs = {
         "model": model,
@@ -36,6 +48,10 @@ def generate_response_with_chat_completion(
         "presence_penalty": presence_penalty,
         "logprobs": logprobs,
         "seed": seed,
+        "stop": stop,
+        "tools": tools,
+        "tool_choice": tool_choice,
+        "parallel_tool_calls": parallel_tool_calls,
         "stream": stream
     }
 
@@ -45,6 +61,8 @@ def generate_response_with_chat_completion(
         return client.chat.completions.create(**clean_kwargs)
     else:
         completion = client.chat.completions.create(**clean_kwargs)
+        if raw_response:
+            return completion
         # Extract the bot's message content from the response
         bot_response = completion.choices[0].message.content
         input_tokens = completion.usage.prompt_tokens
@@ -82,10 +100,31 @@ class ChatGeneric(BaseChatModel):
             "presence_penalty": self.presence_penalty,
         }
 
+    def bind_tools(
+        self,
+        tools: Sequence[Union[dict, type, Callable, BaseTool]],
+        *,
+        tool_choice: Optional[Union[dict, str]] = None,
+        parallel_tool_calls: Optional[bool] = None,
+        **kwargs: Any,
+    ) -> Runnable[LanguageModelInput, BaseMessage]:
+        """
+        Bind tools to the model using the OpenAI tool schema.
+        tool_choice may be 'auto', 'none', 'required', a tool name, or a full tool_choice dict.
+        """
+        formatted_tools = [convert_to_openai_tool(tool) for tool in tools]
+        if isinstance(tool_choice, str) and tool_choice not in ("auto", "none", "required"):
+            tool_choice = {"type": "function", "function": {"name": tool_choice}}
+        if tool_choice is not None:
+            kwargs["tool_choice"] = tool_choice
+        if parallel_tool_calls is not None:
+            kwargs["parallel_tool_calls"] = parallel_tool_calls
+        return super().bind(tools=formatted_tools, **kwargs)
+
     def _format_messages(self, messages: List[BaseMessage]) -> List[dict]:
         """
         Convert LangChain BaseMessage list to generic API message format.
-        Assumes OpenAI-style roles: 'user', 'assistant', 'system'.
+        Assumes OpenAI-style roles: 'user', 'assistant', 'system', 'tool'.
         Adjust if your API requires something else.
         """
         formatted = []
@@ -98,58 +137,122 @@ class ChatGeneric(BaseChatModel):
                 role = "tool"
             else:
                 role = "system"
-            formatted.append({"role": role, "content": msg.content})
+            message = {"role": role, "content": msg.content}
+            if isinstance(msg, AIMessage) and msg.tool_calls:
+                message["tool_calls"] = [
+                    {
+                        "id": tool_call["id"],
+                        "type": "function",
+                        "function": {"name": tool_call["name"], "arguments": json.dumps(tool_call["args"])},
+                    }
+                    for tool_call in msg.tool_calls
+                ]
+            elif isinstance(msg, ToolMessage):
+                message["tool_call_id"] = msg.tool_call_id
+            formatted.append(message)
         return formatted
 
+    def _request_kwargs(self, messages: List[BaseMessage], stop: Optional[List[str]], **kwargs: Any) -> dict:
+        """
+        Build the arguments for generate_response_with_chat_completion(). Bound kwargs
+        (tools, tool_choice, parallel_tool_calls) are passed through to the API.
+        """
+        return {
+            "messages": self._format_messages(messages),
+            "model": self.model,
+            "temperature": self.temperature,
+            "max_tokens": self.max_tokens,
+            "top_p": self.top_p,
+            "frequency_penalty": self.frequency_penalty,
+            "presence_penalty": self.presence_penalty,
+            "logprobs": self.logprobs,
+            "seed": self.seed,
+            "stop": stop,
+            **kwargs,
+        }
+
     def _generate(
-        self, messages: List[BaseMessage], stop: Optional[List[str]] = None
+        self, messages: List[BaseMessage], stop: Optional[List[str]] = None, **kwargs: Any
     ) -> ChatResult:
         """
         Generate a response from the model. Passed in messages are converted to the generic API message format.
+        Tool calls in the response are parsed into AIMessage.tool_calls.
         """
-        formatted_messages = self._format_messages(messages)
-
-        bot_response, input_tokens, output_tokens = generate_response_with_chat_completion(
-            messages=formatted_messages,
-            model=self.model,
-            temperature=self.temperature,
-            max_tokens=self.max_tokens,
-            top_p=self.top_p,
-            frequency_penalty=self.frequency_penalty,
-            presence_penalty=self.presence_penalty,
-            logprobs=self.logprobs,
-            seed=self.seed
+        completion = generate_response_with_chat_completion(
+            **self._request_kwargs(messages, stop, **kwargs),
+            raw_response=True
         )
+        message = completion.choices[0].message
+
+        tool_calls = []
+        invalid_tool_calls = []
+        for raw_tool_call in message.tool_calls or []:
+            raw_tool_call = raw_tool_call.model_dump()
+            try:
+                tool_calls.append(parse_tool_call(raw_tool_call, return_id=True))
+            except Exception as e:
+                invalid_tool_calls.append(make_invalid_tool_call(raw_tool_call, str(e)))
 
-        ai_message = AIMessage(content=bot_response)
-        generation = ChatGeneration(message=ai_message, generation_info={'input_tokens': input_tokens, 'output_tokens': output_tokens})
+        input_tokens = completion.usage.prompt_tokens
+        output_tokens = completion.usage.completion_tokens
+        ai_message = AIMessage(
+            content=message.content or "",
+            tool_calls=tool_calls,
+            invalid_tool_calls=invalid_tool_calls,
+            usage_metadata={
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+                "total_tokens": input_tokens + output_tokens,
+            },
+        )
+        generation = ChatGeneration(
+            message=ai_message,
+            generation_info={
+                'input_tokens': input_tokens,
+                'output_tokens': output_tokens,
+                'finish_reason': completion.choices[0].finish_reason,
+            }
+        )
         return ChatResult(generations=[generation])
 
+    def _convert_chunk(self, chunk: Any) -> Optional[ChatGenerationChunk]:
+        """
+        Convert a streamed completion chunk into a ChatGenerationChunk.
+        Tool-call deltas become tool_call_chunks, which LangChain merges by index.
+        """
+        if not chunk.choices:
+            return None
+        choice = chunk.choices[0]
+        delta = choice.delta
+        tool_call_chunks = [
+            tool_call_chunk(
+                name=tool_call.function.name if tool_call.function else None,
+                args=tool_call.function.arguments if tool_call.function else None,
+                id=tool_call.id,
+                index=tool_call.index,
+            )
+            for tool_call in delta.tool_calls or []
+        ]
+        if delta.content is None and not tool_call_chunks and choice.finish_reason is None:
+            return None
+        chunk_message = AIMessageChunk(content=delta.content or "", tool_call_chunks=tool_call_chunks)
+        generation_info = {'finish_reason': choice.finish_reason} if choice.finish_reason else None
+        return ChatGenerationChunk(message=chunk_message, generation_info=generation_info)
+
     def _stream(
         self, messages: List[BaseMessage], stop: Optional[List[str]] = None, **kwargs: Any
     ) -> Iterator[ChatGenerationChunk]:
         """
         Stream a response from the model.
         """
-        formatted_messages = self._format_messages(messages)
-        
         stream = generate_response_with_chat_completion(
-            messages=formatted_messages,
-            model=self.model,
-            temperature=self.temperature,
-            max_tokens=self.max_tokens,
-            top_p=self.top_p,
-            frequency_penalty=self.frequency_penalty,
-            presence_penalty=self.presence_penalty,
-            logprobs=self.logprobs,
-            seed=self.seed,
+            **self._request_kwargs(messages, stop, **kwargs),
             stream=True
         )
-        
+
         for chunk in stream:
-            if chunk.choices[0].delta.content is not None:
-                chunk_message = AIMessageChunk(content=chunk.choices[0].delta.content)
-                chunk_generation = ChatGenerationChunk(message=chunk_message)
+            chunk_generation = self._convert_chunk(chunk)
+            if chunk_generation is not None:
                 yield chunk_generation
 
     async def _astream(
@@ -158,23 +261,12 @@ class ChatGeneric(BaseChatModel):
         """
         Async stream a response from the model.
         """
-        formatted_messages = self._format_messages(messages)
-        
         stream = generate_response_with_chat_completion(
-            messages=formatted_messages,
-            model=self.model,
-            temperature=self.temperature,
-            max_tokens=self.max_tokens,
-            top_p=self.top_p,
-            frequency_penalty=self.frequency_penalty,
-            presence_penalty=self.presence_penalty,
-            logprobs=self.logprobs,
-            seed=self.seed,
+            **self._request_kwargs(messages, stop, **kwargs),
             stream=True
         )
-        
+
         for chunk in stream:
-            if chunk.choices[0].delta.content is not None:
-                chunk_message = AIMessageChunk(content=chunk.choices[0].delta.content)
-                chunk_generation = ChatGenerationChunk(message=chunk_message)
+            chunk_generation = self._convert_chunk(chunk)
+            if chunk_generation is not None:
                 yield chunk_generation
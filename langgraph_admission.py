@@ -0,0 +1,258 @@
+"""
+Admission control and per-user fair queueing in front of the LLM.
+
+Every chat_node call takes a slot from a shared AdmissionController before calling
+the model. The controller caps global in-flight requests and reserved output tokens,
+orders waiting requests by priority and then by weighted fair queueing across users
+(start-time fair queueing keyed by user_id, or thread_id when no user is given), and
+rejects requests fast when the queue is full or a request has waited too long.
+Under a traffic spike the provider sees a bounded load, each user gets a fair share
+of it, and excess requests fail quickly instead of timing out for everyone.
+
+Configure it with environment variables (all optional, unset means unlimited):
+
+    LLM_MAX_IN_FLIGHT=8             # concurrent LLM requests
+    LLM_MAX_TOKENS_IN_FLIGHT=32768  # sum of max_tokens reserved by running requests
+    LLM_MAX_QUEUE_DEPTH=64          # waiting requests before new ones are rejected immediately
+    LLM_MAX_QUEUE_WAIT_S=20         # longest a request may wait for a slot
+"""
+import os
+import time
+import heapq
+import itertools
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Iterator, Optional
+from langchain_core.messages import RemoveMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.graph import START, END
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is not admitted (queue full or max queue wait exceeded)."""
+
+    def __init__(self, reason: str, waited_s: float = 0.0):
+        super().__init__(reason)
+        self.reason = reason
+        self.waited_s = waited_s
+
+
+class _Request:
+    __slots__ = ("key", "priority", "tokens", "start_tag", "finish_tag", "seq", "enqueued_at", "granted", "cancelled", "event")
+
+    def __init__(self, key: str, priority: int, tokens: int, start_tag: float, finish_tag: float, seq: int):
+        self.key = key
+        self.priority = priority
+        self.tokens = tokens
+        self.start_tag = start_tag
+        self.finish_tag = finish_tag
+        self.seq = seq
+        self.enqueued_at = time.monotonic()
+        self.granted = False
+        self.cancelled = False
+        self.event = threading.Event()
+
+    def sort_key(self) -> tuple:
+        # Higher priority first, then earliest virtual finish time, then arrival order
+        return (-self.priority, self.finish_tag, self.seq)
+
+
+class AdmissionController:
+    """
+    Thread-safe admission controller shared by all sessions of a backend.
+    Use slot() (or slot_for() inside a graph node) around each LLM call.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: Optional[int] = None,
+        max_tokens_in_flight: Optional[int] = None,
+        max_queue_depth: Optional[int] = None,
+        max_queue_wait_s: Optional[float] = None,
+        default_tokens: int = 1024,
+        wait_sample_size: int = 1000,
+    ):
+        self.max_in_flight = max_in_flight
+        self.max_tokens_in_flight = max_tokens_in_flight
+        self.max_queue_depth = max_queue_depth
+        self.max_queue_wait_s = max_queue_wait_s
+        self.default_tokens = default_tokens
+
+        self._lock = threading.Lock()
+        self._queue: list[tuple[tuple, _Request]] = []
+        self._queued = 0
+        self._in_flight = 0
+        self._tokens_in_flight = 0
+        self._virtual_time = 0.0
+        self._last_finish: dict[str, float] = {}
+        self._seq = itertools.count()
+
+        self._admitted = 0
+        self._rejected = 0
+        self._wait_samples: deque[float] = deque(maxlen=wait_sample_size)
+
+    @contextmanager
+    def slot(self, key: str, priority: int = 0, weight: float = 1.0, tokens: Optional[int] = None) -> Iterator[None]:
+        """
+        Block until the request is admitted, then hold a slot for the duration of the block.
+        key identifies the user (or thread) for fairness; a user with weight 2 gets twice the
+        share of a user with weight 1 when both are backlogged. tokens is the output-token
+        reservation counted against max_tokens_in_flight (defaults to default_tokens).
+        Raises AdmissionRejected if the queue is full or max_queue_wait_s elapses.
+        """
+        tokens = self.default_tokens if tokens is None else tokens
+        request = self._acquire(key, priority, weight, tokens)
+        try:
+            yield
+        finally:
+            self._release(request)
+
+    def slot_for(self, config: Optional[RunnableConfig], tokens: Optional[int] = None):
+        """
+        slot() with key/priority/weight read from a graph run config:
+        configurable.user_id (falling back to thread_id), configurable.priority and configurable.weight.
+        """
+        configurable = (config or {}).get("configurable", {})
+        key = configurable.get("user_id") or configurable.get("thread_id") or "default"
+        return self.slot(
+            key=str(key),
+            priority=int(configurable.get("priority", 0)),
+            weight=float(configurable.get("weight", 1.0)),
+            tokens=tokens,
+        )
+
+    def stats(self) -> dict:
+        """Current queue depth, in-flight load and recent queue wait times."""
+        with self._lock:
+            waits = sorted(self._wait_samples)
+            return {
+                "queue_depth": self._queued,
+                "in_flight": self._in_flight,
+                "tokens_in_flight": self._tokens_in_flight,
+                "admitted": self._admitted,
+                "rejected": self._rejected,
+                "wait_ms_p50": round(waits[len(waits) // 2] * 1000, 1) if waits else 0.0,
+                "wait_ms_p95": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))] * 1000, 1) if waits else 0.0,
+                "wait_ms_max": round(waits[-1] * 1000, 1) if waits else 0.0,
+            }
+
+    def _has_capacity(self, tokens: int) -> bool:
+        if self.max_in_flight is not None and self._in_flight >= self.max_in_flight:
+            return False
+        if self.max_tokens_in_flight is not None and self._tokens_in_flight > 0:
+            # A single oversized request is still admitted when nothing else is running
+            return self._tokens_in_flight + tokens <= self.max_tokens_in_flight
+        return True
+
+    def _grant(self, request: _Request) -> None:
+        request.granted = True
+        self._in_flight += 1
+        self._tokens_in_flight += request.tokens
+        self._admitted += 1
+        self._wait_samples.append(time.monotonic() - request.enqueued_at)
+        self._virtual_time = max(self._virtual_time, request.start_tag)
+        request.event.set()
+
+    def _dispatch(self) -> None:
+        """Admit queued requests in fair order while capacity allows. Caller holds the lock."""
+        while self._queue:
+            request = self._queue[0][1]
+            if request.cancelled:
+                heapq.heappop(self._queue)
+                continue
+            if not self._has_capacity(request.tokens):
+                break
+            heapq.heappop(self._queue)
+            self._queued -= 1
+            self._grant(request)
+        if len(self._last_finish) > 10_000:
+            self._last_finish = {k: v for k, v in self._last_finish.items() if v > self._virtual_time}
+
+    def _acquire(self, key: str, priority: int, weight: float, tokens: int) -> _Request:
+        with self._lock:
+            start_tag = max(self._virtual_time, self._last_finish.get(key, 0.0))
+            finish_tag = start_tag + max(tokens, 1) / max(weight, 1e-9)
+            request = _Request(key, priority, tokens, start_tag, finish_tag, next(self._seq))
+
+            if not self._queued and self._has_capacity(tokens):
+                self._last_finish[key] = finish_tag
+                self._grant(request)
+                return request
+            if self.max_queue_depth is not None and self._queued >= self.max_queue_depth:
+                self._rejected += 1
+                raise AdmissionRejected(f"LLM queue is full ({self._queued} waiting)")
+
+            self._last_finish[key] = finish_tag
+            heapq.heappush(self._queue, (request.sort_key(), request))
+            self._queued += 1
+
+        request.event.wait(self.max_queue_wait_s)
+
+        with self._lock:
+            if request.granted:
+                return request
+            request.cancelled = True
+            self._queued -= 1
+            self._rejected += 1
+            waited = time.monotonic() - request.enqueued_at
+            self._refund(request)
+            # This request may have been holding back smaller ones queued behind it
+            self._dispatch()
+        raise AdmissionRejected(f"Timed out after {waited:.1f}s waiting for an LLM slot", waited_s=waited)
+
+    def _refund(self, request: _Request) -> None:
+        """
+        Give back the virtual time a cancelled request reserved for its key, so a user is not
+        pushed back in the fair queue for requests that were never served. Caller holds the lock.
+        """
+        cost = request.finish_tag - request.start_tag
+        for _, queued in self._queue:
+            # Later requests from the same key were tagged after this one; move them up by its cost
+            if queued.key == request.key and queued.seq > request.seq and not queued.cancelled:
+                queued.start_tag -= cost
+                queued.finish_tag -= cost
+        self._queue = [(queued.sort_key(), queued) for _, queued in self._queue if not queued.cancelled]
+        heapq.heapify(self._queue)
+        if request.key in self._last_finish:
+            self._last_finish[request.key] -= cost
+
+    def _release(self, request: _Request) -> None:
+        with self._lock:
+            self._in_flight -= 1
+            self._tokens_in_flight -= request.tokens
+            self._dispatch()
+
+
+def discard_rejected_turn(chatbot, config: RunnableConfig, message_id: str) -> None:
+    """
+    Remove a rejected turn from the thread: the input message with id message_id and anything
+    the turn added after it (tool calls and results when a later LLM call was rejected).
+    The input is checkpointed before chat_node runs, so without this a rejected message
+    would stay in the thread and be sent to the LLM again with the next turn.
+    """
+    messages = chatbot.get_state(config).values.get("messages", [])
+    ids = [message.id for message in messages]
+    if message_id not in ids:
+        return
+    removals = [RemoveMessage(id=id_) for id_ in ids[ids.index(message_id):]]
+    # Applied as input, so the graph's routing does not run on the truncated state,
+    # then the pending chat_node task is cleared so the thread is idle again
+    chatbot.update_state(config, {"messages": removals}, as_node=START)
+    chatbot.update_state(config, None, as_node=END)
+
+
+def _env_number(name: str, cast):
+    value = os.getenv(name)
+    return cast(value) if value else None
+
+
+def admission_from_env(default_tokens: int = 1024) -> AdmissionController:
+    """Build the shared controller from LLM_MAX_* environment variables. Unset limits are unlimited."""
+    return AdmissionController(
+        max_in_flight=_env_number("LLM_MAX_IN_FLIGHT", int),
+        max_tokens_in_flight=_env_number("LLM_MAX_TOKENS_IN_FLIGHT", int),
+        max_queue_depth=_env_number("LLM_MAX_QUEUE_DEPTH", int),
+        max_queue_wait_s=_env_number("LLM_MAX_QUEUE_WAIT_S", float),
+        default_tokens=default_tokens,
+    )
@@ -0,0 +1,264 @@
+"""
+Streaming export and import of conversations stored in chatbot.db.
+
+Exports the latest checkpoint of each thread as newline-delimited JSON or Parquet,
+reading one row at a time from SQLite so memory use stays constant regardless of
+database size. Imports restore threads in bulk-insert transactions directly into the
+SqliteSaver tables, so restored threads load with chatbot.get_state(...) as usual.
+
+    python langgraph_conversation_export.py export chatbot.db backup.jsonl
+    python langgraph_conversation_export.py export chatbot.db backup.parquet --since 2025-01-01
+    python langgraph_conversation_export.py import restored.db backup.jsonl
+"""
+import os
+import json
+import time
+import sqlite3
+import argparse
+from datetime import datetime, timedelta, timezone
+from typing import Iterator, Optional
+from langchain_core.messages import messages_to_dict, messages_from_dict
+from langgraph.checkpoint.base import empty_checkpoint
+from langgraph.checkpoint.sqlite import SqliteSaver
+from langgraph_message_state import MessageList, MessageStateSerializer
+
+# Latest root-namespace checkpoint per thread. checkpoint_id is a time-ordered uuid6, and the
+# (thread_id, checkpoint_ns, checkpoint_id) primary key makes the GROUP BY an index scan.
+LATEST_CHECKPOINTS_QUERY = """
+    SELECT c.thread_id, c.checkpoint_id, c.type, c.checkpoint, c.metadata
+    FROM checkpoints c
+    JOIN (
+        SELECT thread_id, MAX(checkpoint_id) AS checkpoint_id
+        FROM checkpoints
+        WHERE checkpoint_ns = ''
+        GROUP BY thread_id
+    ) latest ON c.thread_id = latest.thread_id AND c.checkpoint_id = latest.checkpoint_id
+    WHERE c.checkpoint_ns = ''
+"""
+
+# uuid6 timestamps count 100 ns intervals since the Gregorian calendar reform
+_UUID_EPOCH = datetime(1582, 10, 15, tzinfo=timezone.utc)
+# A checkpoint's ts and the timestamp in its id are taken microseconds apart; the margin
+# keeps the id prefilter conservative, and the exact ts comparison runs after decoding.
+_CHECKPOINT_ID_MARGIN = timedelta(seconds=60)
+
+INSERT_CHECKPOINT_QUERY = (
+    "INSERT OR IGNORE INTO checkpoints "
+    "(thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata) "
+    "VALUES (?, '', ?, NULL, ?, ?, ?)"
+)
+
+def _parse_time(value: Optional[str]) -> Optional[datetime]:
+    if value is None:
+        return None
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+def _checkpoint_id_bound(dt: datetime) -> str:
+    """
+    Smallest uuid6 string generated at time dt. uuid6 puts the timestamp in its leading
+    hex digits, so checkpoint_id strings compare in time order and can be filtered in SQL.
+    """
+    ticks = max((dt - _UUID_EPOCH) // timedelta(microseconds=1) * 10, 0)
+    return f"{ticks >> 28 & 0xffffffff:08x}-{ticks >> 12 & 0xffff:04x}-6{ticks & 0xfff:03x}-0000-000000000000"
+
+def _format_from_path(path: str, fmt: Optional[str]) -> str:
+    if fmt:
+        return fmt
+    return "parquet" if path.endswith(".parquet") else "jsonl"
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("pyarrow is not installed. Install it with `pip install pyarrow` or use the jsonl format.")
+    return pyarrow
+
+def iter_latest_conversations(db_path: str, since: Optional[str] = None, until: Optional[str] = None) -> Iterator[dict]:
+    """
+    Yield the latest state of each thread as a JSON-serialisable record, one at a time.
+    since/until are ISO 8601 timestamps compared against the checkpoint time (inclusive/exclusive).
+    """
+    since_dt, until_dt = _parse_time(since), _parse_time(until)
+    # Skip threads outside the window by checkpoint_id before paying to decode their checkpoint
+    query, params = LATEST_CHECKPOINTS_QUERY, []
+    if since_dt:
+        query += " AND c.checkpoint_id >= ?"
+        params.append(_checkpoint_id_bound(since_dt - _CHECKPOINT_ID_MARGIN))
+    if until_dt:
+        query += " AND c.checkpoint_id < ?"
+        params.append(_checkpoint_id_bound(until_dt + _CHECKPOINT_ID_MARGIN))
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    # Each thread is decoded once, so its chunks are kept out of the process-wide cache
+    serde = MessageStateSerializer(use_cache=False)
+    try:
+        for thread_id, checkpoint_id, type_, blob, metadata in conn.execute(query, params):
+            checkpoint = serde.loads_typed((type_, blob))
+            ts = _parse_time(checkpoint["ts"])
+            if (since_dt and ts < since_dt) or (until_dt and ts >= until_dt):
+                continue
+            messages = checkpoint["channel_values"].get("messages", [])
+            yield {
+                "thread_id": thread_id,
+                "checkpoint_id": checkpoint_id,
+                "ts": checkpoint["ts"],
+                "metadata": json.loads(metadata) if metadata else {},
+                "messages": messages_to_dict(messages),
+            }
+    finally:
+        conn.close()
+
+def export_conversations(
+    db_path: str,
+    out_path: str,
+    fmt: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    batch_size: int = 100,
+) -> dict:
+    """
+    Stream the latest state of every thread in db_path to out_path.
+    Parquet output is written in row groups of batch_size threads, so memory is bounded by one batch.
+    Returns throughput stats.
+    """
+    fmt = _format_from_path(out_path, fmt)
+    start = time.perf_counter()
+    threads = 0
+    records = iter_latest_conversations(db_path, since=since, until=until)
+
+    if fmt == "jsonl":
+        with open(out_path, "w", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, default=str) + "\n")
+                threads += 1
+    elif fmt == "parquet":
+        pa = _require_pyarrow()
+        schema = pa.schema([
+            ("thread_id", pa.string()),
+            ("checkpoint_id", pa.string()),
+            ("ts", pa.string()),
+            ("metadata", pa.string()),
+            ("messages", pa.string()),
+        ])
+        with pa.parquet.ParquetWriter(out_path, schema) as writer:
+            batch = []
+            for record in records:
+                batch.append({
+                    **record,
+                    "metadata": json.dumps(record["metadata"], default=str),
+                    "messages": json.dumps(record["messages"], default=str),
+                })
+                threads += 1
+                if len(batch) >= batch_size:
+                    writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+                    batch = []
+            if batch:
+                writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+    else:
+        raise ValueError(f"Unknown format '{fmt}', expected 'jsonl' or 'parquet'")
+
+    return _stats(threads, os.path.getsize(db_path), time.perf_counter() - start)
+
+def _read_records(in_path: str, fmt: str, batch_size: int) -> Iterator[dict]:
+    if fmt == "jsonl":
+        with open(in_path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    elif fmt == "parquet":
+        pa = _require_pyarrow()
+        for batch in pa.parquet.ParquetFile(in_path).iter_batches(batch_size=batch_size):
+            for row in batch.to_pylist():
+                row["metadata"] = json.loads(row["metadata"])
+                row["messages"] = json.loads(row["messages"])
+                yield row
+    else:
+        raise ValueError(f"Unknown format '{fmt}', expected 'jsonl' or 'parquet'")
+
+def import_conversations(db_path: str, in_path: str, fmt: Optional[str] = None, batch_size: int = 100) -> dict:
+    """
+    Restore exported threads into db_path, committing one transaction per batch_size threads.
+    Each thread becomes a single checkpoint holding its messages. Checkpoints that already
+    exist (same thread_id and checkpoint_id) are left untouched, so re-running an import is safe.
+    Returns throughput stats.
+    """
+    fmt = _format_from_path(in_path, fmt)
+    start = time.perf_counter()
+    conn = sqlite3.connect(db_path)
+    # Same format the backends write, so restored threads get the chunked message state,
+    # without keeping every imported chunk in the process-wide cache
+    checkpointer = SqliteSaver(conn, serde=MessageStateSerializer(use_cache=False))
+    checkpointer.setup()
+    threads = 0
+    try:
+        batch = []
+        for record in _read_records(in_path, fmt, batch_size):
+            batch.append(_checkpoint_row(checkpointer, record))
+            threads += 1
+            if len(batch) >= batch_size:
+                with conn:
+                    conn.executemany(INSERT_CHECKPOINT_QUERY, batch)
+                batch = []
+        if batch:
+            with conn:
+                conn.executemany(INSERT_CHECKPOINT_QUERY, batch)
+    finally:
+        conn.close()
+    return _stats(threads, os.path.getsize(in_path), time.perf_counter() - start)
+
+def _checkpoint_row(checkpointer: SqliteSaver, record: dict) -> tuple:
+    checkpoint = empty_checkpoint()
+    checkpoint["id"] = record["checkpoint_id"]
+    checkpoint["ts"] = record["ts"]
+    checkpoint["channel_values"] = {"messages": MessageList(messages_from_dict(record["messages"]))}
+    checkpoint["channel_versions"] = {"messages": checkpointer.get_next_version(None, None)}
+    metadata = {**record.get("metadata", {}), "source": "update", "parents": {}}
+    type_, blob = checkpointer.serde.dumps_typed(checkpoint)
+    return (
+        str(record["thread_id"]),
+        checkpoint["id"],
+        type_,
+        blob,
+        checkpointer.jsonplus_serde.dumps(metadata),
+    )
+
+def _stats(threads: int, size_bytes: int, seconds: float) -> dict:
+    return {
+        "threads": threads,
+        "seconds": round(seconds, 3),
+        "threads_per_second": round(threads / seconds, 1) if seconds else 0.0,
+        "mb_per_second": round(size_bytes / 1_000_000 / seconds, 2) if seconds else 0.0,
+    }
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Stream chatbot conversations to and from NDJSON or Parquet.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="Export the latest state of each thread")
+    export_parser.add_argument("db_path")
+    export_parser.add_argument("out_path")
+    export_parser.add_argument("--format", choices=["jsonl", "parquet"], help="Defaults to the output file extension")
+    export_parser.add_argument("--since", help="Only threads last updated at or after this ISO 8601 time")
+    export_parser.add_argument("--until", help="Only threads last updated before this ISO 8601 time")
+    export_parser.add_argument("--batch-size", type=int, default=100)
+
+    import_parser = subparsers.add_parser("import", help="Restore exported threads into a database")
+    import_parser.add_argument("db_path")
+    import_parser.add_argument("in_path")
+    import_parser.add_argument("--format", choices=["jsonl", "parquet"], help="Defaults to the input file extension")
+    import_parser.add_argument("--batch-size", type=int, default=100)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        stats = export_conversations(args.db_path, args.out_path, fmt=args.format, since=args.since, until=args.until, batch_size=args.batch_size)
+        print(f"Exported {stats['threads']} threads in {stats['seconds']}s ({stats['threads_per_second']} threads/s, {stats['mb_per_second']} MB/s of database scanned)")
+    else:
+        stats = import_conversations(args.db_path, args.in_path, fmt=args.format, batch_size=args.batch_size)
+        print(f"Imported {stats['threads']} threads in {stats['seconds']}s ({stats['threads_per_second']} threads/s, {stats['mb_per_second']} MB/s of input read)")
+
+if __name__ == "__main__":
+    main()
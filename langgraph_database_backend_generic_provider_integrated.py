@@ -1,34 +1,55 @@
 import os
 import sqlite3
-from langgraph.graph import StateGraph, START, END
+from langgraph.graph import StateGraph, START
 from typing import TypedDict, Annotated
 from langchain_core.messages import BaseMessage, HumanMessage
 from langchain_generic import ChatGeneric
 from langgraph.checkpoint.sqlite import SqliteSaver
-from langgraph.graph.message import add_messages
+from langgraph_message_state import append_messages, MessageStateSerializer
+from langgraph.prebuilt import ToolNode, tools_condition
+from langgraph_tools import tools
+from langchain_core.runnables import RunnableConfig
 from dotenv import load_dotenv
+from langgraph_admission import admission_from_env
+from langgraph_profiling import profiler_from_env, instrument_checkpointer, instrument_llm, ProfiledGraph
 
 load_dotenv()
 
 llm = ChatGeneric(model="Meta-Llama-3.1-8B-Instruct")
+llm_with_tools = llm.bind_tools(tools)
+
+# Shared admission control for all sessions, configured with LLM_MAX_* (see langgraph_admission.py)
+admission = admission_from_env()
 
 class ChatState(TypedDict):
-    messages: Annotated[list[BaseMessage], add_messages]
+    messages: Annotated[list[BaseMessage], append_messages]
 
-def chat_node(state: ChatState) -> ChatState:
+def chat_node(state: ChatState, config: RunnableConfig) -> ChatState:
     messages = state['messages']
-    response = llm.invoke(messages)
+    with admission.slot_for(config, tokens=llm.max_tokens):
+        response = llm_with_tools.invoke(messages)
     return {'messages': [response]}
 
 conn = sqlite3.connect(database='chatbot.db', check_same_thread=False)
-checkpointer = SqliteSaver(conn=conn)
+checkpointer = SqliteSaver(conn=conn, serde=MessageStateSerializer())
 
 graph = StateGraph(ChatState)
 graph.add_node('chat_node', chat_node)
+# Runs all tool calls from one response concurrently
+graph.add_node('tools', ToolNode(tools))
 graph.add_edge(START, 'chat_node')
-graph.add_edge('chat_node', END)
+graph.add_conditional_edges('chat_node', tools_condition)
+graph.add_edge('tools', 'chat_node')
+
+# Opt-in profiling, enabled by setting CHATBOT_PROFILE_TRACE (see langgraph_profiling.py)
+profiler = profiler_from_env()
+if profiler is not None:
+    checkpointer = instrument_checkpointer(checkpointer, profiler)
+    instrument_llm(llm, profiler)
 
 chatbot = graph.compile(checkpointer=checkpointer)
+if profiler is not None:
+    chatbot = ProfiledGraph(chatbot, profiler)
 
 def unique_threads(thread_lst):
     result = []
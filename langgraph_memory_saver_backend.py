@@ -4,27 +4,43 @@ from typing import TypedDict, Annotated
 from langchain_core.messages import BaseMessage, HumanMessage
 from langchain_ollama import ChatOllama
 from langgraph.checkpoint.memory import InMemorySaver
-from langgraph.graph.message import add_messages
+from langgraph_message_state import append_messages, MessageStateSerializer
+from langchain_core.runnables import RunnableConfig
 from dotenv import load_dotenv
+from langgraph_admission import admission_from_env
+from langgraph_profiling import profiler_from_env, instrument_checkpointer, instrument_llm, ProfiledGraph
 
 load_dotenv()
 
 OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://localhost:11434")
-llm = ChatOllama(model="llama3.1:8b", base_url=OLLAMA_HOST)
+# num_predict caps the reply length, and is what admission reserves against LLM_MAX_TOKENS_IN_FLIGHT
+llm = ChatOllama(model="llama3.1:8b", base_url=OLLAMA_HOST, num_predict=4096)
+
+# Shared admission control for all sessions, configured with LLM_MAX_* (see langgraph_admission.py)
+admission = admission_from_env()
 
 class ChatState(TypedDict):
-    messages: Annotated[list[BaseMessage], add_messages]
+    messages: Annotated[list[BaseMessage], append_messages]
 
-def chat_node(state: ChatState) -> ChatState:
+def chat_node(state: ChatState, config: RunnableConfig) -> ChatState:
     messages = state['messages']
-    response = llm.invoke(messages)
+    with admission.slot_for(config, tokens=llm.num_predict):
+        response = llm.invoke(messages)
     return {'messages': [response]}
 
-checkpointer = InMemorySaver()
+checkpointer = InMemorySaver(serde=MessageStateSerializer())
 
 graph = StateGraph(ChatState)
 graph.add_node('chat_node', chat_node)
 graph.add_edge(START, 'chat_node')
 graph.add_edge('chat_node', END)
 
-chatbot = graph.compile(checkpointer=checkpointer)
\ No newline at end of file
+# Opt-in profiling, enabled by setting CHATBOT_PROFILE_TRACE (see langgraph_profiling.py)
+profiler = profiler_from_env()
+if profiler is not None:
+    checkpointer = instrument_checkpointer(checkpointer, profiler)
+    instrument_llm(llm, profiler)
+
+chatbot = graph.compile(checkpointer=checkpointer)
+if profiler is not None:
+    chatbot = ProfiledGraph(chatbot, profiler)
\ No newline at end of file
@@ -0,0 +1,313 @@
+"""
+Append-optimized message state for the chatbot graphs.
+
+With add_messages and the stock serializer, every turn handles the whole thread in
+Python: each checkpoint load decodes every message into a pydantic object, the reducer
+converts every message and builds a fresh id -> position dict, and each checkpoint
+store encodes every message again. For long threads that is most of a turn.
+
+append_messages keeps add_messages' semantics. State values are MessageList objects:
+lists whose prefix is sealed into immutable chunks of CHUNK_SIZE messages, each with
+its set of ids and, once serialized, its encoded bytes and a digest of them.
+MessageStateSerializer stores a MessageList as its chunks' bytes plus the unsealed
+tail, and decoding takes chunks' messages from a process-wide cache keyed by digest
+and bounded by CHUNK_CACHE_BYTES of encoded chunks (CHATBOT_MESSAGE_CACHE_MB). Once a
+thread's chunks are cached (after its first turn in this process), a turn encodes
+and decodes only the tail, and the reducer checks new ids against one set per chunk.
+What stays linear in the thread length is C-level copying: the list of message
+pointers in each new state and the checkpoint blob, which still holds every chunk's
+bytes so it can be read without the cache.
+
+Chunks are shared between states, threads and get_state() results, so messages in
+state must be treated as immutable, as LangGraph already expects of state values.
+MessageList is a list subclass: nodes and frontends see an ordinary list. Checkpoints
+written by MessageStateSerializer can be read by any JsonPlusSerializer as long as
+this module is importable; checkpoints holding plain lists are read as before.
+"""
+import os
+import uuid
+import hashlib
+import threading
+import contextvars
+from collections import OrderedDict
+from typing import Any, Optional
+import ormsgpack
+from langchain_core.messages import BaseMessage, BaseMessageChunk, RemoveMessage, convert_to_messages, message_chunk_to_message
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer, EXT_METHOD_SINGLE_ARG
+from langgraph.graph.message import add_messages, Messages
+
+CHUNK_SIZE = 64
+# Limit on the encoded size of the chunks whose decoded messages are kept in the cache.
+# Resident memory is a few times this, see README "Message State".
+CHUNK_CACHE_BYTES = int(float(os.getenv("CHATBOT_MESSAGE_CACHE_MB") or 64) * 1024 * 1024)
+
+_serde = JsonPlusSerializer()
+# digest -> (messages, ids, encoded size), least recently used first
+_cache: "OrderedDict[bytes, tuple[tuple, frozenset, int]]" = OrderedDict()
+_cache_bytes = 0
+_cache_lock = threading.Lock()
+# Unset by MessageStateSerializer(use_cache=False) while it encodes or decodes
+_use_cache = contextvars.ContextVar("use_chunk_cache", default=True)
+
+
+class _Chunk:
+    """CHUNK_SIZE (or fewer) consecutive messages, encoded at most once."""
+
+    __slots__ = ("messages", "ids", "_encoded")
+
+    def __init__(self, messages: tuple, encoded: Optional[tuple] = None, ids: Optional[frozenset] = None):
+        self.messages = messages
+        self.ids = ids if ids is not None else frozenset(message.id for message in messages)
+        self._encoded = encoded
+
+    def encoded(self) -> tuple:
+        """(digest, type, bytes) of the messages, computed on first use and kept on the chunk."""
+        if self._encoded is None:
+            type_, data = _serde.dumps_typed(list(self.messages))
+            self._encoded = (hashlib.blake2b(data, digest_size=16).digest(), type_, data)
+            _cache_put(self._encoded[0], self.messages, self.ids, len(data))
+        return self._encoded
+
+
+def _cache_put(digest: bytes, messages: tuple, ids: frozenset, size: int) -> None:
+    """
+    Keep a chunk's decoded messages for the next load of a checkpoint holding it.
+
+    Only messages and ids are kept: a loaded chunk takes its bytes from the checkpoint
+    blob, so caching them too would only duplicate memory the live states already hold.
+    Entries are weighed by their encoded size and evicted least recently used first.
+    """
+    global _cache_bytes
+    if not _use_cache.get() or size > CHUNK_CACHE_BYTES:
+        return
+    with _cache_lock:
+        previous = _cache.pop(digest, None)
+        if previous is not None:
+            _cache_bytes -= previous[2]
+        _cache[digest] = (messages, ids, size)
+        _cache_bytes += size
+        while _cache_bytes > CHUNK_CACHE_BYTES:
+            _cache_bytes -= _cache.popitem(last=False)[1][2]
+
+
+def _cache_get(digest: bytes) -> Optional[tuple]:
+    if not _use_cache.get():
+        return None
+    with _cache_lock:
+        entry = _cache.get(digest)
+        if entry is not None:
+            _cache.move_to_end(digest)
+        return entry
+
+
+def clear_chunk_cache() -> None:
+    """Drop every cached chunk, e.g. to measure cold loads."""
+    global _cache_bytes
+    with _cache_lock:
+        _cache.clear()
+        _cache_bytes = 0
+
+
+def chunk_cache_info() -> dict:
+    """Number of cached chunks, their total encoded size and the configured limit, in bytes."""
+    with _cache_lock:
+        return {"chunks": len(_cache), "bytes": _cache_bytes, "max_bytes": CHUNK_CACHE_BYTES}
+
+
+def _appendable(message: BaseMessage) -> bool:
+    return message.id is not None and not isinstance(message, BaseMessageChunk)
+
+
+class MessageList(list):
+    """
+    A list of messages whose first len(chunks) * ~CHUNK_SIZE messages are held in sealed chunks.
+
+    The chunks describe the list as it was built. A list mutated in place no longer matches
+    them; _valid_chunks() detects that and the chunks are rebuilt from the current contents.
+    """
+
+    __slots__ = ("_chunks", "_sealed")
+
+    def __init__(self, messages=(), chunks: Optional[tuple] = None):
+        super().__init__(messages)
+        self._chunks = chunks
+        self._sealed = sum(len(chunk.messages) for chunk in chunks) if chunks is not None else 0
+
+    @classmethod
+    def from_messages(cls, messages: list, reuse: tuple = ()) -> "MessageList":
+        """
+        Chunk messages, reusing any chunk from reuse whose messages appear unchanged and in order.
+        Only a trailing partial chunk is left unsealed.
+        """
+        by_first_id = {chunk.messages[0].id: chunk for chunk in reuse}
+        chunks, pending = [], []
+        position = 0
+        while position < len(messages):
+            chunk = by_first_id.get(messages[position].id)
+            if chunk is not None and tuple(messages[position:position + len(chunk.messages)]) == chunk.messages:
+                if pending:
+                    chunks.append(_Chunk(tuple(pending)))
+                    pending = []
+                chunks.append(chunk)
+                position += len(chunk.messages)
+                continue
+            pending.append(messages[position])
+            position += 1
+            if len(pending) == CHUNK_SIZE:
+                chunks.append(_Chunk(tuple(pending)))
+                pending = []
+        return cls(messages, chunks=tuple(chunks))
+
+    @classmethod
+    def from_chunks(cls, payload: dict) -> "MessageList":
+        """Rebuild a MessageList written by MessageStateSerializer, decoding only uncached chunks."""
+        chunks = []
+        for digest, type_, data in payload["chunks"]:
+            entry = _cache_get(digest)
+            if entry is not None:
+                chunks.append(_Chunk(entry[0], encoded=(digest, type_, data), ids=entry[1]))
+                continue
+            chunk = _Chunk(tuple(_serde.loads_typed((type_, data))), encoded=(digest, type_, data))
+            _cache_put(digest, chunk.messages, chunk.ids, len(data))
+            chunks.append(chunk)
+        messages = [message for chunk in chunks for message in chunk.messages]
+        messages.extend(payload["tail"])
+        return cls(messages, chunks=tuple(chunks))
+
+    def _valid_chunks(self) -> Optional[tuple]:
+        """The chunks, rebuilt if missing or stale. None if a message cannot be chunked (no id)."""
+        if self._chunks is not None and self._chunks_match():
+            return self._chunks
+        if not all(_appendable(message) for message in self):
+            return None
+        rebuilt = MessageList.from_messages(self, reuse=self._chunks or ())
+        self._chunks, self._sealed = rebuilt._chunks, rebuilt._sealed
+        return self._chunks
+
+    def _chunks_match(self) -> bool:
+        if self._sealed > len(self):
+            return False
+        position = 0
+        for chunk in self._chunks:
+            end = position + len(chunk.messages)
+            # Identity is compared first, so for an unmodified list this is a pointer comparison
+            if tuple(self[position:end]) != chunk.messages:
+                return False
+            position = end
+        return True
+
+    def _contains_any(self, ids: set) -> bool:
+        if any(not chunk.ids.isdisjoint(ids) for chunk in self._chunks):
+            return True
+        return any(message.id in ids for message in self[self._sealed:])
+
+
+def _normalize_right(right: Messages) -> list[BaseMessage]:
+    if not isinstance(right, list):
+        right = [right]
+    messages = [message_chunk_to_message(m) for m in convert_to_messages(right)]
+    for message in messages:
+        if message.id is None:
+            message.id = str(uuid.uuid4())
+    return messages
+
+
+def append_messages(left: Messages, right: Messages) -> MessageList:
+    """
+    Drop-in replacement for add_messages.
+
+    If every incoming message has an id not already in left (and none is a RemoveMessage),
+    the messages are appended after checking their ids against each chunk's id set and the
+    unsealed tail, and full chunks are sealed from the tail. Any other update (replacing a
+    message by id, RemoveMessage, REMOVE_ALL_MESSAGES) is handed to add_messages and the
+    result is re-chunked reusing unchanged chunks, so results are identical to add_messages.
+    """
+    new_messages = _normalize_right(right)
+
+    if isinstance(left, list):
+        current = left if isinstance(left, MessageList) else MessageList(left)
+        chunks = current._valid_chunks()
+        new_ids = {m.id for m in new_messages}
+        if (
+            chunks is not None
+            and len(new_ids) == len(new_messages)
+            and not any(isinstance(m, RemoveMessage) for m in new_messages)
+            and not current._contains_any(new_ids)
+        ):
+            merged = MessageList(current, chunks=chunks)
+            merged.extend(new_messages)
+            while len(merged) - merged._sealed >= CHUNK_SIZE:
+                merged._chunks += (_Chunk(tuple(merged[merged._sealed:merged._sealed + CHUNK_SIZE])),)
+                merged._sealed += CHUNK_SIZE
+            return merged
+        reuse = chunks or ()
+    else:
+        reuse = ()
+
+    return MessageList.from_messages(add_messages(left, new_messages), reuse=reuse)
+
+
+class MessageStateSerializer(JsonPlusSerializer):
+    """
+    JsonPlusSerializer that stores MessageList values as encoded chunks plus the unsealed tail.
+
+    Handles a MessageList passed directly (InMemorySaver serializes each channel value) or
+    inside a checkpoint's channel_values (SqliteSaver serializes the whole checkpoint).
+    Decoding goes through the stock ext hook, which calls MessageList.from_chunks.
+
+    With use_cache=False, chunks are encoded and decoded without reading or filling the
+    process-wide chunk cache. One-pass tools (export, import) use it so every thread they
+    touch does not end up in the cache; the checkpoints they write are the same.
+    """
+
+    def __init__(self, *args: Any, use_cache: bool = True, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.use_cache = use_cache
+
+    def loads_typed(self, data: tuple[str, bytes]) -> Any:
+        token = _use_cache.set(self.use_cache)
+        try:
+            return super().loads_typed(data)
+        finally:
+            _use_cache.reset(token)
+
+    def dumps_typed(self, obj: Any) -> tuple[str, bytes]:
+        token = _use_cache.set(self.use_cache)
+        try:
+            return self._dumps_typed(obj)
+        finally:
+            _use_cache.reset(token)
+
+    def _dumps_typed(self, obj: Any) -> tuple[str, bytes]:
+        try:
+            chunked = self._chunked(obj)
+            if chunked is not obj:
+                type_, data = super().dumps_typed(chunked)
+                if type_ == "msgpack":
+                    return type_, data
+        except (ormsgpack.MsgpackEncodeError, TypeError):
+            pass
+        # Anything the chunked format cannot hold is stored (or rejected) exactly as the stock serializer does
+        return super().dumps_typed(obj)
+
+    def _chunked(self, obj: Any) -> Any:
+        if isinstance(obj, MessageList):
+            return self._to_ext(obj)
+        if isinstance(obj, dict) and isinstance(obj.get("channel_values"), dict):
+            values = obj["channel_values"]
+            if any(isinstance(value, MessageList) for value in values.values()):
+                return {**obj, "channel_values": {
+                    key: self._to_ext(value) if isinstance(value, MessageList) else value
+                    for key, value in values.items()
+                }}
+        return obj
+
+    def _to_ext(self, messages: MessageList) -> Any:
+        chunks = messages._valid_chunks()
+        if chunks is None:
+            return list(messages)
+        payload = {"chunks": [chunk.encoded() for chunk in chunks], "tail": messages[messages._sealed:]}
+        type_, data = _serde.dumps_typed((MessageList.__module__, MessageList.__name__, payload, "from_chunks"))
+        if type_ != "msgpack":
+            raise TypeError(f"MessageList payload encoded as {type_}")
+        return ormsgpack.Ext(EXT_METHOD_SINGLE_ARG, data)
@@ -0,0 +1,435 @@
+"""
+Opt-in profiling for the LangGraph chatbot pipeline.
+
+Records per-turn span timings (checkpoint load, node execution, LLM call,
+time to first token, checkpoint write) to a local JSONL trace file, and can
+sample slow turns with pyinstrument or cProfile. Works offline, independent
+of LangSmith.
+
+Enable it in the backends by setting CHATBOT_PROFILE_TRACE to a file path:
+
+    CHATBOT_PROFILE_TRACE=traces/chatbot.jsonl
+    CHATBOT_PROFILE_SLOW_MS=2000            # optional: sample turns slower than this
+    CHATBOT_PROFILE_SAMPLER=cprofile        # optional: 'pyinstrument' (default) or 'cprofile'
+
+With a threshold set, the sampler runs on every turn, since a turn is only known to be
+slow once it ends. pyinstrument samples the stack every millisecond and adds little
+overhead. cProfile traces every function call, so while it is enabled every span, the
+turn total and the slow-turn decision include its overhead; records written that way
+carry "sampler": "cprofile". Use it for call counts, not for latency numbers.
+
+Summarize a trace file with:
+
+    python langgraph_profiling.py summarize traces/chatbot.jsonl
+"""
+import io
+import os
+import json
+import time
+import pstats
+import argparse
+import cProfile
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator, Optional
+from uuid import UUID
+from langchain_core.callbacks import BaseCallbackHandler
+
+_current_turn: ContextVar[Optional["TurnRecord"]] = ContextVar("chatbot_profile_turn", default=None)
+
+
+class TurnRecord:
+    """Spans collected for a single graph invocation."""
+
+    def __init__(self, kind: str, thread_id: Optional[str]):
+        self.kind = kind
+        self.thread_id = thread_id
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.spans: list[dict] = []
+        self._lock = threading.Lock()
+
+    def add_span(self, name: str, start: float, end: float, **attrs: Any) -> None:
+        span = {
+            "name": name,
+            "start_ms": round((start - self.start) * 1000, 3),
+            "duration_ms": round((end - start) * 1000, 3),
+        }
+        span.update(attrs)
+        with self._lock:
+            self.spans.append(span)
+
+
+class ProfilingCallbackHandler(BaseCallbackHandler):
+    """
+    LangChain callback handler that turns graph node and chat model runs into spans.
+    One handler is created per turn and attached through the run config.
+    """
+
+    def __init__(self, turn: TurnRecord):
+        self.turn = turn
+        self._starts: dict[UUID, tuple[str, float]] = {}
+        self._first_token: set[UUID] = set()
+
+    def on_chain_start(self, serialized, inputs, *, run_id, metadata=None, **kwargs) -> None:
+        node = (metadata or {}).get("langgraph_node")
+        if node and kwargs.get("name") == node:
+            self._starts[run_id] = (f"node:{node}", time.perf_counter())
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs) -> None:
+        self._finish(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs) -> None:
+        self._finish(run_id, error=type(error).__name__)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs) -> None:
+        self._starts[run_id] = ("llm_call", time.perf_counter())
+
+    def on_llm_new_token(self, token, *, run_id, **kwargs) -> None:
+        if run_id in self._first_token or run_id not in self._starts:
+            return
+        self._first_token.add(run_id)
+        start = self._starts[run_id][1]
+        self.turn.add_span("llm_first_token", start, time.perf_counter())
+
+    def on_llm_end(self, response, *, run_id, **kwargs) -> None:
+        self._finish(run_id)
+
+    def on_llm_error(self, error, *, run_id, **kwargs) -> None:
+        self._finish(run_id, error=type(error).__name__)
+
+    def _finish(self, run_id: UUID, **attrs: Any) -> None:
+        entry = self._starts.pop(run_id, None)
+        if entry is not None:
+            name, start = entry
+            self.turn.add_span(name, start, time.perf_counter(), **attrs)
+
+
+class PipelineProfiler:
+    """
+    Collects turn spans and appends one JSON record per turn to trace_path.
+    Turns slower than slow_turn_ms also carry a sampled profile
+    (pyinstrument by default, or cProfile) when a threshold is set.
+    """
+
+    def __init__(self, trace_path: str, slow_turn_ms: Optional[float] = None, sampler: str = "pyinstrument", top_n: int = 25):
+        if sampler not in ("cprofile", "pyinstrument"):
+            raise ValueError(f"Unknown sampler '{sampler}', expected 'cprofile' or 'pyinstrument'")
+        self.trace_path = trace_path
+        self.slow_turn_ms = slow_turn_ms
+        self.sampler = sampler
+        self.top_n = top_n
+        self._write_lock = threading.Lock()
+
+    @contextmanager
+    def turn(self, kind: str, thread_id: Optional[str] = None) -> Iterator[TurnRecord]:
+        """Open a turn; spans recorded inside it are written out when it closes."""
+        record = TurnRecord(kind, thread_id)
+        token = _current_turn.set(record)
+        sampler = self._start_sampler()
+        error = None
+        try:
+            yield record
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            total_ms = (time.perf_counter() - record.start) * 1000
+            profile = self._stop_sampler(sampler, total_ms)
+            _current_turn.reset(token)
+            self._write(record, total_ms, error, profile, self.sampler if sampler is not None else None)
+
+    @contextmanager
+    def span(self, name: str, **attrs: Any) -> Iterator[None]:
+        """Time a block as a span of the active turn. Does nothing outside a turn."""
+        record = _current_turn.get()
+        if record is None:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            record.add_span(name, start, time.perf_counter(), **attrs)
+
+    def _start_sampler(self):
+        if self.slow_turn_ms is None:
+            return None
+        if self.sampler == "pyinstrument":
+            try:
+                from pyinstrument import Profiler
+            except ImportError:
+                raise ImportError("pyinstrument is not installed. Install it with `pip install pyinstrument`, or set sampler='cprofile' (which inflates timings).")
+            sampler = Profiler()
+        else:
+            sampler = cProfile.Profile()
+        try:
+            if self.sampler == "pyinstrument":
+                sampler.start()
+            else:
+                sampler.enable()
+        except (RuntimeError, ValueError):
+            # Another profiler is already active in this thread (e.g. a nested turn).
+            return None
+        return sampler
+
+    def _stop_sampler(self, sampler, total_ms: float) -> Optional[str]:
+        if sampler is None:
+            return None
+        if self.sampler == "pyinstrument":
+            sampler.stop()
+            if total_ms < self.slow_turn_ms:
+                return None
+            return sampler.output_text(unicode=False, color=False)
+        sampler.disable()
+        if total_ms < self.slow_turn_ms:
+            return None
+        out = io.StringIO()
+        pstats.Stats(sampler, stream=out).sort_stats("cumulative").print_stats(self.top_n)
+        return out.getvalue()
+
+    def _write(self, record: TurnRecord, total_ms: float, error: Optional[str], profile: Optional[str], sampler: Optional[str]) -> None:
+        entry = {
+            "ts": record.started_at,
+            "kind": record.kind,
+            "thread_id": record.thread_id,
+            "total_ms": round(total_ms, 3),
+            "spans": sorted(record.spans, key=lambda s: s["start_ms"]),
+        }
+        if error:
+            entry["error"] = error
+        if profile:
+            entry["profile"] = profile
+        if sampler:
+            entry["sampler"] = sampler
+        directory = os.path.dirname(self.trace_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        line = json.dumps(entry, default=str)
+        with self._write_lock:
+            with open(self.trace_path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+
+def instrument_checkpointer(checkpointer, profiler: PipelineProfiler):
+    """
+    Record checkpoint_load / checkpoint_write spans around a checkpointer's
+    read and write methods. The checkpointer is patched in place and returned.
+    """
+    spans = {
+        "get_tuple": "checkpoint_load",
+        "put": "checkpoint_write",
+        "put_writes": "checkpoint_write_pending",
+    }
+    for method, span_name in spans.items():
+        original = getattr(checkpointer, method)
+
+        def timed(*args, _original=original, _span=span_name, **kwargs):
+            with profiler.span(_span):
+                return _original(*args, **kwargs)
+
+        setattr(checkpointer, method, timed)
+
+        async_original = getattr(checkpointer, "a" + method)
+
+        async def atimed(*args, _original=async_original, _span=span_name, **kwargs):
+            with profiler.span(_span):
+                return await _original(*args, **kwargs)
+
+        setattr(checkpointer, "a" + method, atimed)
+    return checkpointer
+
+
+# Methods that turn LangChain messages into a provider request: ChatGeneric, ChatOllama
+_MESSAGE_FORMATTERS = ("_format_messages", "_convert_messages_to_ollama_messages")
+
+
+def instrument_llm(llm, profiler: PipelineProfiler):
+    """
+    Record a message_format span around the chat model's conversion of messages into the
+    provider's request format, so it can be told apart from the request itself. The span
+    falls inside llm_call. The model is patched in place and returned.
+    """
+    for method in _MESSAGE_FORMATTERS:
+        original = getattr(llm, method, None)
+        if original is None:
+            continue
+
+        def timed(*args, _original=original, **kwargs):
+            with profiler.span("message_format"):
+                return _original(*args, **kwargs)
+
+        # Chat models are pydantic models, whose __setattr__ rejects names that are not fields
+        object.__setattr__(llm, method, timed)
+    return llm
+
+
+def _thread_id(config: Optional[dict]) -> Optional[str]:
+    return ((config or {}).get("configurable") or {}).get("thread_id")
+
+
+def _with_callback(config: Optional[dict], handler: BaseCallbackHandler) -> dict:
+    config = dict(config or {})
+    callbacks = config.get("callbacks")
+    if callbacks is None:
+        config["callbacks"] = [handler]
+    elif isinstance(callbacks, list):
+        config["callbacks"] = [*callbacks, handler]
+    else:
+        # A callback manager was passed in; copy it so the caller's stays untouched.
+        manager = callbacks.copy()
+        manager.add_handler(handler, inherit=True)
+        config["callbacks"] = manager
+    return config
+
+
+class ProfiledGraph:
+    """
+    Wraps a compiled graph so invoke/stream/get_state calls are recorded as turns.
+    Everything else is delegated to the wrapped graph.
+    """
+
+    def __init__(self, graph, profiler: PipelineProfiler):
+        self.graph = graph
+        self.profiler = profiler
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.graph, name)
+
+    def invoke(self, input, config=None, **kwargs):
+        with self.profiler.turn("invoke", _thread_id(config)) as turn:
+            return self.graph.invoke(input, _with_callback(config, ProfilingCallbackHandler(turn)), **kwargs)
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        with self.profiler.turn("invoke", _thread_id(config)) as turn:
+            return await self.graph.ainvoke(input, _with_callback(config, ProfilingCallbackHandler(turn)), **kwargs)
+
+    def stream(self, input, config=None, **kwargs):
+        with self.profiler.turn("stream", _thread_id(config)) as turn:
+            yield from self.graph.stream(input, _with_callback(config, ProfilingCallbackHandler(turn)), **kwargs)
+
+    async def astream(self, input, config=None, **kwargs):
+        with self.profiler.turn("stream", _thread_id(config)) as turn:
+            async for chunk in self.graph.astream(input, _with_callback(config, ProfilingCallbackHandler(turn)), **kwargs):
+                yield chunk
+
+    def get_state(self, config, **kwargs):
+        with self.profiler.turn("get_state", _thread_id(config)):
+            return self.graph.get_state(config, **kwargs)
+
+
+def profiler_from_env() -> Optional[PipelineProfiler]:
+    """Build a profiler from CHATBOT_PROFILE_* environment variables, or None if disabled."""
+    trace_path = os.getenv("CHATBOT_PROFILE_TRACE")
+    if not trace_path:
+        return None
+    slow_turn_ms = os.getenv("CHATBOT_PROFILE_SLOW_MS")
+    return PipelineProfiler(
+        trace_path=trace_path,
+        slow_turn_ms=float(slow_turn_ms) if slow_turn_ms else None,
+        sampler=os.getenv("CHATBOT_PROFILE_SAMPLER", "pyinstrument"),
+    )
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(trace_path: str, kind: Optional[str] = None) -> dict:
+    """Aggregate a trace file into per-span latency statistics."""
+    totals: list[float] = []
+    by_span: dict[str, list[float]] = {}
+    slow_turns = 0
+    cprofile_turns = 0
+    with open(trace_path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            if kind and entry.get("kind") != kind:
+                continue
+            totals.append(entry["total_ms"])
+            if "profile" in entry:
+                slow_turns += 1
+            if entry.get("sampler") == "cprofile":
+                cprofile_turns += 1
+            for span in entry.get("spans", []):
+                by_span.setdefault(span["name"], []).append(span["duration_ms"])
+
+    def stats(values: list[float]) -> dict:
+        return {
+            "count": len(values),
+            "mean_ms": round(sum(values) / len(values), 3),
+            "p50_ms": _percentile(values, 50),
+            "p95_ms": _percentile(values, 95),
+            "max_ms": max(values),
+            "total_ms": round(sum(values), 3),
+        }
+
+    grand_total = sum(totals)
+    spans = {}
+    for name, values in sorted(by_span.items()):
+        spans[name] = stats(values)
+        spans[name]["share"] = round(sum(values) / grand_total, 4) if grand_total else 0.0
+    return {
+        "turns": stats(totals) if totals else {"count": 0},
+        "sampled_slow_turns": slow_turns,
+        "cprofile_turns": cprofile_turns,
+        "spans": spans,
+    }
+
+
+def _print_summary(summary: dict) -> None:
+    turns = summary["turns"]
+    print(f"Turns: {turns['count']}  (sampled slow turns: {summary['sampled_slow_turns']})")
+    if not turns["count"]:
+        return
+    if summary["cprofile_turns"]:
+        print(f"Note: {summary['cprofile_turns']} turns were recorded with cProfile enabled; their timings include its overhead.")
+    print(f"Turn latency: mean {turns['mean_ms']:.1f} ms, p50 {turns['p50_ms']:.1f} ms, p95 {turns['p95_ms']:.1f} ms, max {turns['max_ms']:.1f} ms")
+    print()
+    header = f"{'span':<28}{'count':>8}{'mean ms':>12}{'p50 ms':>12}{'p95 ms':>12}{'max ms':>12}{'share':>9}"
+    print(header)
+    print("-" * len(header))
+    for name, s in summary["spans"].items():
+        print(f"{name:<28}{s['count']:>8}{s['mean_ms']:>12.1f}{s['p50_ms']:>12.1f}{s['p95_ms']:>12.1f}{s['max_ms']:>12.1f}{s['share']:>8.1%}")
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Inspect chatbot profiling traces.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    summarize_parser = subparsers.add_parser("summarize", help="Per-span latency statistics for a trace file")
+    summarize_parser.add_argument("trace_path")
+    summarize_parser.add_argument("--kind", choices=["invoke", "stream", "get_state"], help="Only include turns of this kind")
+    summarize_parser.add_argument("--json", action="store_true", help="Print the summary as JSON")
+
+    slowest_parser = subparsers.add_parser("slowest", help="Show the slowest turns and their sampled profiles")
+    slowest_parser.add_argument("trace_path")
+    slowest_parser.add_argument("-n", type=int, default=5)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "summarize":
+        summary = summarize(args.trace_path, kind=args.kind)
+        if args.json:
+            print(json.dumps(summary, indent=2))
+        else:
+            _print_summary(summary)
+    elif args.command == "slowest":
+        with open(args.trace_path, encoding="utf-8") as f:
+            entries = [json.loads(line) for line in f if line.strip()]
+        for entry in sorted(entries, key=lambda e: e["total_ms"], reverse=True)[:args.n]:
+            print(f"{entry['total_ms']:.1f} ms  {entry['kind']}  thread={entry.get('thread_id')}")
+            for span in entry["spans"]:
+                print(f"    {span['name']:<26}{span['duration_ms']:>10.1f} ms")
+            if entry.get("profile"):
+                print(entry["profile"])
+
+
+if __name__ == "__main__":
+    main()
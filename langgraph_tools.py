@@ -0,0 +1,70 @@
+"""
+Tools available to the chatbot graph.
+
+Tools are plain LangChain @tool functions. The graph binds them to the LLM and
+runs them in a ToolNode, which executes every tool call from one LLM response
+concurrently (a thread pool for invoke/stream, asyncio.gather for ainvoke/astream),
+so a multi-tool turn takes as long as the slowest tool rather than the sum.
+"""
+import ast
+import operator
+from datetime import datetime, timezone
+from langchain_core.tools import tool
+
+_OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: operator.pow,
+    ast.USub: operator.neg,
+    ast.UAdd: operator.pos,
+}
+
+# The model chooses the expression, so keep every step cheap: '9**9**9' must fail fast, not hang a worker
+_MAX_EXPRESSION_LENGTH = 200
+_MAX_EXPONENT = 100
+_MAX_POWER_BASE = 10**6
+_MAX_RESULT_BITS = 4096
+
+def _check_power(base, exponent):
+    if abs(exponent) > _MAX_EXPONENT:
+        raise ValueError(f"Exponent {exponent} is too large (limit {_MAX_EXPONENT})")
+    if abs(base) > _MAX_POWER_BASE:
+        raise ValueError(f"Base of a power is too large (limit {_MAX_POWER_BASE})")
+
+def _evaluate(node):
+    if isinstance(node, ast.Expression):
+        return _evaluate(node.body)
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+        return node.value
+    if isinstance(node, ast.BinOp) and type(node.op) in _OPERATORS:
+        left, right = _evaluate(node.left), _evaluate(node.right)
+        if isinstance(node.op, ast.Pow):
+            _check_power(left, right)
+        result = _OPERATORS[type(node.op)](left, right)
+        if isinstance(result, int) and result.bit_length() > _MAX_RESULT_BITS:
+            raise ValueError("Result is too large")
+        return result
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _OPERATORS:
+        return _OPERATORS[type(node.op)](_evaluate(node.operand))
+    raise ValueError(f"Unsupported expression: {ast.dump(node)}")
+
+@tool
+def calculator(expression: str) -> str:
+    """Evaluate an arithmetic expression such as '(3 + 4) * 2 / 7'. Supports + - * / // % and ** (exponents up to 100)."""
+    if len(expression) > _MAX_EXPRESSION_LENGTH:
+        return f"Error: Expression is too long (limit {_MAX_EXPRESSION_LENGTH} characters)"
+    try:
+        return str(_evaluate(ast.parse(expression, mode='eval')))
+    except (SyntaxError, ValueError, ZeroDivisionError, OverflowError, RecursionError) as e:
+        return f"Error: {e}"
+
+@tool
+def get_current_datetime() -> str:
+    """Return the current date and time in UTC, in ISO 8601 format."""
+    return datetime.now(timezone.utc).isoformat()
+
+tools = [calculator, get_current_datetime]
@@ -1,6 +1,7 @@
 import uuid
 import streamlit as st
-from langgraph_database_backend import chatbot, retrieve_all_threads
+from langgraph_database_backend import admission, chatbot, retrieve_all_threads
+from langgraph_admission import AdmissionRejected, discard_rejected_turn
 from langchain_core.messages import HumanMessage
 
 def generate_thread_id():
@@ -36,6 +37,12 @@ st.sidebar.title("Chatbot")
 if st.sidebar.button("New Chat"):
     reset_chat()
 
+queue_stats = admission.stats()
+st.sidebar.caption(
+    f"LLM queue: {queue_stats['queue_depth']} waiting, {queue_stats['in_flight']} in flight, "
+    f"p95 wait {queue_stats['wait_ms_p95']:.0f} ms"
+)
+
 st.sidebar.header("My Conversations")
 
 for thread_id in st.session_state.chat_threads[::-1]:
@@ -65,6 +72,8 @@ user_input = st.chat_input("Talk to me")
 
 if user_input:
 
+    # Explicit id so a rejected turn can be removed from the thread again
+    user_message_id = str(uuid.uuid4())
     st.session_state.message_history.append({'role': 'user', 'content': user_input})
     with st.chat_message("user"):
         st.text(user_input)
@@ -79,15 +88,22 @@ if user_input:
     }
 
     with st.chat_message("assistant"):
-        ai_message = st.write_stream(
-            message_chunk.content for message_chunk, metadata in chatbot.stream(
-                {'messages': [HumanMessage(content=user_input)]}, 
-                config=CONFIG,
-                stream_mode='messages'
+        try:
+            ai_message = st.write_stream(
+                message_chunk.content for message_chunk, metadata in chatbot.stream(
+                    {'messages': [HumanMessage(content=user_input, id=user_message_id)]}, 
+                    config=CONFIG,
+                    stream_mode='messages'
+                )
             )
-        )
-
-    st.session_state.message_history.append({'role': 'assistant', 'content': ai_message})
+        except AdmissionRejected as e:
+            ai_message = None
+            discard_rejected_turn(chatbot, CONFIG, user_message_id)
+            st.session_state.message_history.pop()
+            st.warning(f"The assistant is busy right now, please try again in a moment. ({e.reason})")
+
+    if ai_message:
+        st.session_state.message_history.append({'role': 'assistant', 'content': ai_message})
 
     # response = chatbot.invoke({'messages': [HumanMessage(content=user_input)]}, config=CONFIG)
     # ai_message = response['messages'][-1].content
@@ -1,8 +1,9 @@
 import uuid
 # import time
 import streamlit as st
-from langgraph_database_backend_generic_provider_integrated import chatbot, retrieve_all_threads
-from langchain_core.messages import HumanMessage
+from langgraph_database_backend_generic_provider_integrated import admission, chatbot, retrieve_all_threads
+from langgraph_admission import AdmissionRejected, discard_rejected_turn
+from langchain_core.messages import HumanMessage, AIMessage, AIMessageChunk
 
 def generate_thread_id():
     return str(uuid.uuid4())
@@ -37,6 +38,12 @@ st.sidebar.title("Chatbot")
 if st.sidebar.button("New Chat"):
     reset_chat()
 
+queue_stats = admission.stats()
+st.sidebar.caption(
+    f"LLM queue: {queue_stats['queue_depth']} waiting, {queue_stats['in_flight']} in flight, "
+    f"p95 wait {queue_stats['wait_ms_p95']:.0f} ms"
+)
+
 st.sidebar.header("My Conversations")
 
 for thread_id in st.session_state.chat_threads[::-1]:
@@ -49,8 +56,11 @@ for thread_id in st.session_state.chat_threads[::-1]:
         for message in messages:
             if isinstance(message, HumanMessage):
                 role = 'user'
-            else:
+            elif isinstance(message, AIMessage) and message.content:
                 role = 'assistant'
+            else:
+                # Tool results and tool-call-only AI messages are not shown in the chat
+                continue
             temp_messages.append({'role': role, 'content': message.content})
         
         st.session_state.message_history = temp_messages
@@ -66,6 +76,8 @@ user_input = st.chat_input("Talk to me")
 
 if user_input:
 
+    # Explicit id so a rejected turn can be removed from the thread again
+    user_message_id = str(uuid.uuid4())
     st.session_state.message_history.append({'role': 'user', 'content': user_input})
     with st.chat_message("user"):
         st.text(user_input)
@@ -81,20 +93,27 @@ if user_input:
     with st.chat_message("assistant"):
         def stream_generator():
             for message_chunk, metadata in chatbot.stream(
-                {'messages': [HumanMessage(content=user_input)]}, 
+                {'messages': [HumanMessage(content=user_input, id=user_message_id)]}, 
                 config=CONFIG,
                 stream_mode='messages'
             ):
-                # Check if this is an AI message chunk with content
-                if hasattr(message_chunk, 'content') and message_chunk.content:
+                # Check if this is an AI message chunk with content (tool results are not streamed to the UI)
+                if isinstance(message_chunk, AIMessageChunk) and message_chunk.content:
                     # # Add delay to make streaming more readable
                     # time.sleep(0.05)  # 50ms delay between chunks
                     # Yield the content directly - LangGraph handles the streaming properly
                     yield message_chunk.content
         
-        ai_message = st.write_stream(stream_generator())
-
-    st.session_state.message_history.append({'role': 'assistant', 'content': ai_message})
+        try:
+            ai_message = st.write_stream(stream_generator())
+        except AdmissionRejected as e:
+            ai_message = None
+            discard_rejected_turn(chatbot, CONFIG, user_message_id)
+            st.session_state.message_history.pop()
+            st.warning(f"The assistant is busy right now, please try again in a moment. ({e.reason})")
+
+    if ai_message:
+        st.session_state.message_history.append({'role': 'assistant', 'content': ai_message})
 
     # response = chatbot.invoke({'messages': [HumanMessage(content=user_input)]}, config=CONFIG)
     # ai_message = response['messages'][-1].content
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Offline tests for tool calling in ChatGeneric and parallel tool execution in the graph.
+The OpenAI client is replaced with a stub returning canned completions.
+"""
+import os
+import time
+from types import SimpleNamespace
+os.environ.setdefault("LLM_API_KEY", "test-key")
+
+from langchain_core.messages import HumanMessage, AIMessage, SystemMessage, ToolMessage
+from langchain_core.tools import tool
+from langchain_generic import chat_generic
+from langchain_generic.chat_generic import ChatGeneric
+from langgraph_tools import calculator
+from fake_chatbot import build_fake_chatbot
+
+def ns(**kwargs):
+    return SimpleNamespace(**kwargs)
+
+def raw_tool_call(id, name, arguments):
+    return ns(model_dump=lambda: {"id": id, "type": "function", "function": {"name": name, "arguments": arguments}})
+
+def completion(content=None, tool_calls=None):
+    message = ns(content=content, tool_calls=tool_calls)
+    return ns(
+        choices=[ns(message=message, finish_reason="tool_calls" if tool_calls else "stop")],
+        usage=ns(prompt_tokens=10, completion_tokens=5),
+    )
+
+def stream_chunk(content=None, tool_calls=None, finish_reason=None):
+    return ns(choices=[ns(delta=ns(content=content, tool_calls=tool_calls), finish_reason=finish_reason)])
+
+def tool_delta(index, id=None, name=None, arguments=None):
+    return ns(index=index, id=id, function=ns(name=name, arguments=arguments))
+
+class StubCompletions:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def create(self, **kwargs):
+        self.requests.append(kwargs)
+        return self.responses.pop(0)
+
+def stub_client(monkeypatch, responses):
+    completions = StubCompletions(responses)
+    monkeypatch.setattr(chat_generic, "client", ns(chat=ns(completions=completions)))
+    return completions
+
+def test_format_messages_keeps_tool_calls_and_tool_call_id():
+    llm = ChatGeneric(model="test-model")
+    formatted = llm._format_messages([
+        SystemMessage(content="Be brief."),
+        HumanMessage(content="What is 2+2?"),
+        AIMessage(content="", tool_calls=[{"id": "call_1", "name": "calculator", "args": {"expression": "2+2"}}]),
+        ToolMessage(content="4", tool_call_id="call_1"),
+    ])
+    assert [m["role"] for m in formatted] == ["system", "user", "assistant", "tool"]
+    assert formatted[2]["tool_calls"] == [
+        {"id": "call_1", "type": "function", "function": {"name": "calculator", "arguments": '{"expression": "2+2"}'}}
+    ]
+    assert formatted[3]["tool_call_id"] == "call_1"
+
+def test_bind_tools_sends_schema_and_parses_tool_calls(monkeypatch):
+    completions = stub_client(monkeypatch, [completion(tool_calls=[
+        raw_tool_call("call_1", "calculator", '{"expression": "6*7"}'),
+        raw_tool_call("call_2", "calculator", '{not json'),
+    ])])
+    llm = ChatGeneric(model="test-model").bind_tools([calculator], tool_choice="calculator")
+
+    result = llm.invoke([HumanMessage(content="What is 6*7?")])
+
+    request = completions.requests[0]
+    assert request["tools"][0]["function"]["name"] == "calculator"
+    assert request["tool_choice"] == {"type": "function", "function": {"name": "calculator"}}
+    assert result.tool_calls == [{"name": "calculator", "args": {"expression": "6*7"}, "id": "call_1", "type": "tool_call"}]
+    assert result.invalid_tool_calls[0]["id"] == "call_2"
+    assert result.usage_metadata["total_tokens"] == 15
+
+def test_stream_merges_tool_call_deltas(monkeypatch):
+    stub_client(monkeypatch, [iter([
+        stream_chunk(tool_calls=[tool_delta(0, id="call_1", name="calculator", arguments="")]),
+        stream_chunk(tool_calls=[tool_delta(0, arguments='{"expression"')]),
+        stream_chunk(tool_calls=[tool_delta(0, arguments=': "1+1"}')]),
+        stream_chunk(tool_calls=[tool_delta(1, id="call_2", name="get_current_datetime", arguments="{}")]),
+        stream_chunk(finish_reason="tool_calls"),
+    ])])
+    llm = ChatGeneric(model="test-model")
+
+    merged = None
+    for chunk in llm.stream([HumanMessage(content="Hi")]):
+        merged = chunk if merged is None else merged + chunk
+
+    assert [(c["id"], c["name"], c["args"]) for c in merged.tool_calls] == [
+        ("call_1", "calculator", {"expression": "1+1"}),
+        ("call_2", "get_current_datetime", {}),
+    ]
+
+def test_calculator_rejects_expensive_expressions_quickly():
+    assert calculator.invoke({"expression": "(3 + 4) * 2 ** 3"}) == "56"
+    start = time.perf_counter()
+    expensive = [
+        "9**9**9",
+        "9**9**7",
+        "(10**6)**100**100",
+        "1000001**2",
+        "1.5**-1000",
+        "*".join(["2**100"] * 40),  # many cheap powers multiplied into one huge number
+        "(" * 150 + "1" + ")" * 150,  # longer than the expression limit
+    ]
+    for expression in expensive:
+        assert calculator.invoke({"expression": expression}).startswith("Error:"), expression
+    assert time.perf_counter() - start < 0.5
+
+@tool
+def slow_lookup(key: str) -> str:
+    """Look up a key slowly."""
+    time.sleep(0.3)
+    return key.upper()
+
+def test_graph_runs_tool_calls_concurrently(monkeypatch):
+    stub_client(monkeypatch, [
+        completion(tool_calls=[
+            raw_tool_call(f"call_{i}", "slow_lookup", f'{{"key": "k{i}"}}') for i in range(4)
+        ]),
+        completion(content="done"),
+    ])
+    llm_with_tools = ChatGeneric(model="test-model").bind_tools([slow_lookup])
+    chatbot = build_fake_chatbot(llm=llm_with_tools, tools=[slow_lookup])
+
+    start = time.perf_counter()
+    result = chatbot.invoke({'messages': [HumanMessage(content="Look up four keys")]})
+    elapsed = time.perf_counter() - start
+
+    tool_messages = [m for m in result['messages'] if isinstance(m, ToolMessage)]
+    assert [m.content for m in tool_messages] == ["K0", "K1", "K2", "K3"]
+    assert result['messages'][-1].content == "done"
+    # Four 0.3s tools in sequence would take 1.2s
+    assert elapsed < 0.9
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Tests for langgraph_admission.py: global caps, fair ordering, priorities and fast rejection.
+"""
+import time
+import threading
+import pytest
+from langchain_core.messages import HumanMessage
+from langchain_core.runnables import RunnableLambda
+from langchain_core.tools import tool
+from langgraph.checkpoint.memory import InMemorySaver
+from fake_chatbot import build_fake_chatbot, fake_llm
+from langgraph_admission import AdmissionController, AdmissionRejected, discard_rejected_turn
+
+def wait_for_queue_depth(controller, depth):
+    deadline = time.monotonic() + 2
+    while controller.stats()['queue_depth'] != depth:
+        assert time.monotonic() < deadline, "queue did not reach expected depth"
+        time.sleep(0.001)
+
+def queue_requests(controller, requests, order):
+    """Queue (key, priority) requests one at a time behind a held slot and record admission order."""
+    threads = []
+    for i, (key, priority) in enumerate(requests):
+        def run(key=key, priority=priority, name=f"{key}{i}"):
+            with controller.slot(key=key, priority=priority, tokens=1):
+                order.append(name)
+        thread = threading.Thread(target=run)
+        thread.start()
+        threads.append(thread)
+        wait_for_queue_depth(controller, i + 1)
+    return threads
+
+def test_users_are_interleaved_fairly():
+    controller = AdmissionController(max_in_flight=1)
+    order = []
+    with controller.slot(key="holder", tokens=1):
+        threads = queue_requests(controller, [("a", 0), ("a", 0), ("a", 0), ("b", 0)], order)
+    for thread in threads:
+        thread.join()
+    # b's single request is not stuck behind a's whole backlog
+    assert order == ["a0", "b3", "a1", "a2"]
+
+def test_priority_is_served_first():
+    controller = AdmissionController(max_in_flight=1)
+    order = []
+    with controller.slot(key="holder", tokens=1):
+        threads = queue_requests(controller, [("a", 0), ("b", 0), ("c", 5)], order)
+    for thread in threads:
+        thread.join()
+    assert order[0] == "c2"
+
+def test_caps_in_flight_requests_and_tokens():
+    controller = AdmissionController(max_in_flight=3, max_tokens_in_flight=100)
+    peak = {'in_flight': 0, 'tokens_in_flight': 0}
+    lock = threading.Lock()
+
+    def run(i):
+        with controller.slot(key=f"user{i % 4}", tokens=40):
+            stats = controller.stats()
+            with lock:
+                peak['in_flight'] = max(peak['in_flight'], stats['in_flight'])
+                peak['tokens_in_flight'] = max(peak['tokens_in_flight'], stats['tokens_in_flight'])
+            time.sleep(0.01)
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(12)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = controller.stats()
+    assert peak['in_flight'] == 2  # 3 x 40 tokens would exceed the 100 token cap
+    assert peak['tokens_in_flight'] == 80
+    assert stats['admitted'] == 12 and stats['in_flight'] == 0 and stats['queue_depth'] == 0
+
+def test_rejects_when_queue_is_full_or_wait_is_too_long():
+    controller = AdmissionController(max_in_flight=1, max_queue_depth=1, max_queue_wait_s=0.2)
+    errors = []
+
+    def wait_for_slot():
+        try:
+            with controller.slot(key="a"):
+                pass
+        except AdmissionRejected as e:
+            errors.append(e)
+
+    with controller.slot(key="holder"):
+        waiter = threading.Thread(target=wait_for_slot)
+        waiter.start()
+        wait_for_queue_depth(controller, 1)
+
+        start = time.monotonic()
+        with pytest.raises(AdmissionRejected, match="queue is full"):
+            with controller.slot(key="b"):
+                pass
+        assert time.monotonic() - start < 0.1
+
+        waiter.join()
+
+    assert errors and errors[0].waited_s >= 0.2
+    stats = controller.stats()
+    assert stats['rejected'] == 2 and stats['queue_depth'] == 0 and stats['in_flight'] == 0
+
+def test_timed_out_request_does_not_cost_its_user_fair_share():
+    controller = AdmissionController(max_in_flight=1)
+    order = []
+    with controller.slot(key="holder", tokens=1):
+        controller.max_queue_wait_s = 0.05
+        with pytest.raises(AdmissionRejected):
+            with controller.slot(key="a", tokens=10):
+                pass
+        controller.max_queue_wait_s = None
+        threads = queue_requests(controller, [("a", 0), ("b", 0), ("a", 0), ("b", 0)], order)
+    for thread in threads:
+        thread.join()
+    # Without the refund, a's rejected 10-token request would put both of b's requests first
+    assert order == ["a0", "b1", "a2", "b3"]
+
+@tool
+def echo(text: str) -> str:
+    """Echo the text."""
+    return text
+
+@pytest.mark.parametrize("tools", [None, [echo]])
+def test_discard_rejected_turn_leaves_no_dangling_input(tools):
+    controller = AdmissionController(max_in_flight=1, max_queue_depth=0)
+    llm = fake_llm()
+
+    def admitted_llm(messages):
+        with controller.slot(key="u"):
+            return llm.invoke(messages)
+
+    chatbot = build_fake_chatbot(InMemorySaver(), llm=RunnableLambda(admitted_llm), tools=tools)
+    config = {'configurable': {'thread_id': 't1'}}
+
+    for existing in ([], ["turn 0", "hello there"]):
+        if existing:
+            chatbot.invoke({'messages': [HumanMessage(content="turn 0")]}, config=config)
+        with controller.slot(key="holder"):
+            with pytest.raises(AdmissionRejected):
+                chatbot.invoke({'messages': [HumanMessage(content="rejected", id="h1")]}, config=config)
+        assert [m.content for m in chatbot.get_state(config).values['messages']][-1] == "rejected"
+
+        discard_rejected_turn(chatbot, config, "h1")
+        state = chatbot.get_state(config)
+        assert [m.content for m in state.values['messages']] == existing
+        assert state.next == ()
+
+    response = chatbot.invoke({'messages': [HumanMessage(content="turn 1")]}, config=config)
+    assert [m.content for m in response['messages']] == ["turn 0", "hello there", "turn 1", "hello there"]
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Offline round-trip tests for langgraph_conversation_export.py.
+"""
+import json
+import sqlite3
+from datetime import datetime, timedelta, timezone
+from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.base.id import uuid6
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from langgraph.checkpoint.sqlite import SqliteSaver
+from fake_chatbot import build_fake_chatbot
+import langgraph_message_state
+from langgraph_message_state import MessageStateSerializer, append_messages, chunk_cache_info, clear_chunk_cache
+from langgraph_conversation_export import export_conversations, import_conversations, iter_latest_conversations, _checkpoint_id_bound
+
+def build_chatbot(db_path):
+    conn = sqlite3.connect(database=str(db_path), check_same_thread=False)
+    return build_fake_chatbot(SqliteSaver(conn=conn, serde=MessageStateSerializer()), reducer=append_messages)
+
+def config(thread_id):
+    return {'configurable': {'thread_id': thread_id}}
+
+def messages_of(chatbot, thread_id):
+    return [(type(m).__name__, m.content) for m in chatbot.get_state(config(thread_id)).values['messages']]
+
+def populate(db_path):
+    chatbot = build_chatbot(db_path)
+    for thread_id, turns in [('a', 2), ('b', 1)]:
+        for i in range(turns):
+            chatbot.invoke({'messages': [HumanMessage(content=f"{thread_id} turn {i}")]}, config=config(thread_id))
+    assert messages_of(chatbot, 'a') == [
+        ('HumanMessage', 'a turn 0'), ('AIMessage', 'hello there'),
+        ('HumanMessage', 'a turn 1'), ('AIMessage', 'hello there'),
+    ]
+    assert messages_of(chatbot, 'b') == [('HumanMessage', 'b turn 0'), ('AIMessage', 'hello there')]
+    return chatbot
+
+def test_jsonl_round_trip_restores_latest_state(tmp_path):
+    source = populate(tmp_path / "source.db")
+    export_path = tmp_path / "backup.jsonl"
+
+    stats = export_conversations(str(tmp_path / "source.db"), str(export_path))
+    assert stats['threads'] == 2
+    records = {r['thread_id']: r for r in map(json.loads, export_path.read_text().splitlines())}
+    assert sorted(records) == ['a', 'b']
+    assert len(records['a']['messages']) == 4 and len(records['b']['messages']) == 2
+
+    stats = import_conversations(str(tmp_path / "restored.db"), str(export_path), batch_size=1)
+    assert stats['threads'] == 2
+    restored = build_chatbot(tmp_path / "restored.db")
+    for thread_id, expected_count in [('a', 4), ('b', 2)]:
+        assert len(messages_of(restored, thread_id)) == expected_count
+        assert messages_of(restored, thread_id) == messages_of(source, thread_id)
+
+    # Restored threads continue like any other thread, and re-importing is a no-op
+    restored.invoke({'messages': [HumanMessage(content="b turn 1")]}, config=config('b'))
+    assert len(messages_of(restored, 'b')) == 4
+    import_conversations(str(tmp_path / "restored.db"), str(export_path))
+    assert len(messages_of(restored, 'b')) == 4
+
+def test_parquet_round_trip_and_time_filter(tmp_path):
+    source = populate(tmp_path / "source.db")
+    export_path = tmp_path / "backup.parquet"
+
+    assert export_conversations(str(tmp_path / "source.db"), str(export_path), until="2000-01-01")['threads'] == 0
+    stats = export_conversations(str(tmp_path / "source.db"), str(export_path), since="2000-01-01")
+    assert stats['threads'] == 2
+
+    import_conversations(str(tmp_path / "restored.db"), str(export_path))
+    restored = build_chatbot(tmp_path / "restored.db")
+    assert len(messages_of(restored, 'a')) == 4
+    assert messages_of(restored, 'a') == messages_of(source, 'a')
+
+def test_time_filter_skips_checkpoints_by_id_before_decoding(tmp_path, monkeypatch):
+    before = datetime.now(timezone.utc) - timedelta(milliseconds=1)
+    checkpoint_id = str(uuid6(clock_seq=-1))
+    after = datetime.now(timezone.utc) + timedelta(milliseconds=1)
+    assert _checkpoint_id_bound(before) <= checkpoint_id < _checkpoint_id_bound(after)
+
+    populate(tmp_path / "source.db")
+    decoded = []
+    loads_typed = JsonPlusSerializer.loads_typed
+    monkeypatch.setattr(JsonPlusSerializer, "loads_typed", lambda self, data: decoded.append(data) or loads_typed(self, data))
+
+    tomorrow = (datetime.now(timezone.utc) + timedelta(days=1)).isoformat()
+    assert list(iter_latest_conversations(str(tmp_path / "source.db"), since=tomorrow)) == []
+    assert list(iter_latest_conversations(str(tmp_path / "source.db"), until="2000-01-01")) == []
+    assert decoded == []
+    assert len(list(iter_latest_conversations(str(tmp_path / "source.db"), until=tomorrow))) == 2
+    assert len(decoded) == 2
+
+def test_export_and_import_leave_the_chunk_cache_empty(tmp_path, monkeypatch):
+    monkeypatch.setattr(langgraph_message_state, "CHUNK_SIZE", 4)
+    source = build_chatbot(tmp_path / "source.db")
+    for i in range(10):
+        source.invoke({'messages': [HumanMessage(content=f"turn {i}")]}, config=config('a'))
+    assert len(source.get_state(config('a')).values['messages']._chunks) == 5
+    export_path = tmp_path / "backup.jsonl"
+
+    clear_chunk_cache()
+    export_conversations(str(tmp_path / "source.db"), str(export_path))
+    import_conversations(str(tmp_path / "restored.db"), str(export_path))
+    assert chunk_cache_info()["chunks"] == 0
+
+    # The imported checkpoint is still chunked, and the backends' serializer caches it as usual
+    restored = build_chatbot(tmp_path / "restored.db")
+    messages = restored.get_state(config('a')).values['messages']
+    assert len(messages._chunks) == 5 and chunk_cache_info()["chunks"] == 5
+    assert messages_of(restored, 'a') == messages_of(source, 'a')
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Tests for langgraph_message_state.py: append_messages must behave exactly like add_messages.
+"""
+import random
+import sqlite3
+import pytest
+from langchain_core.messages import HumanMessage, AIMessage, AIMessageChunk, RemoveMessage
+from langgraph.graph.message import add_messages, REMOVE_ALL_MESSAGES
+from langgraph.checkpoint.sqlite import SqliteSaver
+from fake_chatbot import build_fake_chatbot
+import langgraph_message_state
+from langgraph_message_state import MessageList, MessageStateSerializer, append_messages
+
+def snapshot(messages):
+    return [(type(m).__name__, m.id, m.content) for m in messages]
+
+def random_update(rng, current, step):
+    ids = [m.id for m in current]
+    choice = rng.random()
+    if choice < 0.6 or not ids:
+        return [HumanMessage(content=f"new {step}", id=f"id-{step}"), AIMessage(content=f"reply {step}", id=f"id-{step}-ai")]
+    if choice < 0.75:
+        return [AIMessage(content=f"edited {step}", id=rng.choice(ids))]
+    if choice < 0.9:
+        return [RemoveMessage(id=rng.choice(ids))]
+    if choice < 0.95:
+        return [AIMessageChunk(content=f"chunk {step}", id=f"chunk-{step}")]
+    return [RemoveMessage(id=REMOVE_ALL_MESSAGES), HumanMessage(content=f"restart {step}", id=f"restart-{step}")]
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    monkeypatch.setattr(langgraph_message_state, "CHUNK_SIZE", 4)
+
+def test_matches_add_messages_on_random_updates(small_chunks):
+    rng = random.Random(7)
+    expected, actual = [], MessageList()
+    for step in range(300):
+        update = random_update(rng, expected, step)
+        expected = add_messages(expected, [m.model_copy() for m in update])
+        actual = append_messages(actual, [m.model_copy() for m in update])
+        assert isinstance(actual, MessageList)
+        assert snapshot(actual) == snapshot(expected)
+        # Round-trips through the serializer, with and without the chunk cache
+        serde = MessageStateSerializer()
+        assert snapshot(serde.loads_typed(serde.dumps_typed(actual))) == snapshot(expected)
+        if step % 50 == 0:
+            langgraph_message_state.clear_chunk_cache()
+            actual = serde.loads_typed(serde.dumps_typed(actual))
+            assert snapshot(actual) == snapshot(expected)
+
+def test_appends_seal_chunks_and_edits_reuse_unchanged_ones(small_chunks):
+    messages = append_messages([], [HumanMessage(content=str(i), id=f"m{i}") for i in range(10)])
+    assert [len(chunk.messages) for chunk in messages._chunks] == [4, 4]
+    assert [m.id for m in messages[messages._sealed:]] == ["m8", "m9"]
+
+    forked = append_messages(messages, [AIMessage(content="x", id="x")])
+    assert forked._chunks == messages._chunks and len(messages) == 10
+
+    edited = append_messages(messages, [RemoveMessage(id="m1")])
+    assert [m.id for m in edited] == ["m0"] + [f"m{i}" for i in range(2, 10)]
+    assert edited._chunks[-1] is messages._chunks[1]
+
+    # In-place mutation is detected, so the id check does not trust stale chunks
+    mutated = MessageList(messages, chunks=messages._chunks)
+    mutated[0] = HumanMessage(content="replaced", id="r0")
+    assert snapshot(append_messages(mutated, [AIMessage(content="again", id="m0")]))[-1] == ("AIMessage", "m0", "again")
+    assert snapshot(append_messages(mutated, [AIMessage(content="edit", id="r0")]))[0] == ("AIMessage", "r0", "edit")
+
+def test_sqlite_turns_decode_and_encode_only_the_tail(tmp_path, monkeypatch, small_chunks):
+    conn = sqlite3.connect(database=str(tmp_path / "chatbot.db"), check_same_thread=False)
+    chatbot = build_fake_chatbot(SqliteSaver(conn=conn, serde=MessageStateSerializer()), reducer=append_messages)
+    config = {'configurable': {'thread_id': 't1'}}
+    for i in range(10):
+        chatbot.invoke({'messages': [HumanMessage(content=f"turn {i}")]}, config=config)
+
+    decoded, encoded = [], []
+    serde = langgraph_message_state._serde
+    loads_typed, dumps_typed = serde.loads_typed, serde.dumps_typed
+    monkeypatch.setattr(serde, "loads_typed", lambda data: decoded.append(data) or loads_typed(data))
+    monkeypatch.setattr(serde, "dumps_typed", lambda obj: isinstance(obj, list) and encoded.append(obj) or dumps_typed(obj))
+
+    messages_before = chatbot.get_state(config).values['messages']
+    chatbot.invoke({'messages': [HumanMessage(content="turn 10")]}, config=config)
+    messages = chatbot.get_state(config).values['messages']
+
+    assert isinstance(messages, list)
+    assert len(messages) == 22 and len({m.id for m in messages}) == 22
+    assert [m.content for m in messages[-2:]] == ["turn 10", "hello there"]
+    # Loads took every sealed chunk from the cache; the turn sealed and encoded at most one new chunk
+    assert decoded == []
+    assert len(encoded) <= 1
+    assert messages[0] is messages_before[0]
+    # A plain JsonPlusSerializer (e.g. an export tool) reads the same checkpoint
+    assert SqliteSaver(conn=conn).get(config)["channel_values"]["messages"] == messages
+
+def test_chunk_cache_is_bounded_by_encoded_bytes(monkeypatch, small_chunks):
+    langgraph_message_state.clear_chunk_cache()
+    messages = append_messages([], [HumanMessage(content="x" * 100, id=f"m{i:02d}") for i in range(40)])
+    size = len(langgraph_message_state._serde.dumps_typed(list(messages[:4]))[1])
+    monkeypatch.setattr(langgraph_message_state, "CHUNK_CACHE_BYTES", 3 * size)
+    serde = MessageStateSerializer()
+    stored = serde.dumps_typed(messages)
+
+    # Only the three most recently encoded chunks are kept, as messages and ids without their bytes
+    assert langgraph_message_state.chunk_cache_info() == {"chunks": 3, "bytes": 3 * size, "max_bytes": 3 * size}
+    assert list(langgraph_message_state._cache.values()) == [
+        (chunk.messages, chunk.ids, size) for chunk in messages._chunks[-3:]
+    ]
+    loaded = serde.loads_typed(stored)
+    assert snapshot(loaded) == snapshot(messages)
+    # Loading a thread larger than the cache cycles through it without exceeding the limit
+    assert langgraph_message_state.chunk_cache_info()["bytes"] == 3 * size
+    assert [entry[0] for entry in langgraph_message_state._cache.values()] == [chunk.messages for chunk in loaded._chunks[-3:]]
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Offline tests for langgraph_profiling.py using a fake chat model and an in-memory checkpointer.
+"""
+import os
+import json
+import pytest
+from types import SimpleNamespace
+os.environ.setdefault("LLM_API_KEY", "test-key")
+
+from langchain_core.messages import HumanMessage
+from langchain_generic import chat_generic
+from langchain_generic.chat_generic import ChatGeneric
+from langgraph.checkpoint.memory import InMemorySaver
+from fake_chatbot import build_fake_chatbot
+from langgraph_profiling import PipelineProfiler, ProfiledGraph, instrument_checkpointer, instrument_llm, summarize
+
+def build_chatbot(profiler, llm=None):
+    checkpointer = instrument_checkpointer(InMemorySaver(), profiler)
+    return ProfiledGraph(build_fake_chatbot(checkpointer, llm=llm), profiler)
+
+def read_trace(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+def test_invoke_records_stage_spans(tmp_path):
+    trace = tmp_path / "trace.jsonl"
+    chatbot = build_chatbot(PipelineProfiler(str(trace)))
+    config = {'configurable': {'thread_id': 't1'}}
+
+    response = chatbot.invoke({'messages': [HumanMessage(content="Hi")]}, config=config)
+    assert response['messages'][-1].content == "hello there"
+
+    [entry] = read_trace(trace)
+    names = {span['name'] for span in entry['spans']}
+    assert entry['kind'] == 'invoke'
+    assert entry['thread_id'] == 't1'
+    assert {'checkpoint_load', 'checkpoint_write', 'node:chat_node', 'llm_call'} <= names
+    assert 'profile' not in entry and 'sampler' not in entry
+
+def test_stream_records_first_token_and_slow_turn_profile(tmp_path):
+    trace = tmp_path / "trace.jsonl"
+    chatbot = build_chatbot(PipelineProfiler(str(trace), slow_turn_ms=0, sampler="cprofile"))
+    config = {'configurable': {'thread_id': 't2'}}
+
+    chunks = list(chatbot.stream({'messages': [HumanMessage(content="Hi")]}, config=config, stream_mode='messages'))
+    assert chunks
+    state = chatbot.get_state(config)
+    assert len(state.values['messages']) == 2
+
+    stream_entry, state_entry = read_trace(trace)
+    assert stream_entry['kind'] == 'stream'
+    assert 'llm_first_token' in {span['name'] for span in stream_entry['spans']}
+    assert 'cumulative' in stream_entry['profile']
+    assert stream_entry['sampler'] == 'cprofile'
+    assert state_entry['kind'] == 'get_state'
+
+    summary = summarize(str(trace), kind='stream')
+    assert summary['turns']['count'] == 1
+    assert summary['sampled_slow_turns'] == 1
+    assert summary['cprofile_turns'] == 1
+    assert summary['spans']['llm_call']['count'] == 1
+
+def test_slow_turns_are_sampled_with_pyinstrument_by_default(tmp_path):
+    pytest.importorskip("pyinstrument")
+    trace = tmp_path / "trace.jsonl"
+    chatbot = build_chatbot(PipelineProfiler(str(trace), slow_turn_ms=0))
+
+    chatbot.invoke({'messages': [HumanMessage(content="Hi")]}, config={'configurable': {'thread_id': 't4'}})
+
+    [entry] = read_trace(trace)
+    assert entry['sampler'] == 'pyinstrument'
+    assert entry['profile']
+
+def test_message_format_is_recorded_inside_llm_call(tmp_path, monkeypatch):
+    completion = SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content="hi", tool_calls=None), finish_reason="stop")],
+        usage=SimpleNamespace(prompt_tokens=1, completion_tokens=1),
+    )
+    create = lambda **kwargs: completion
+    monkeypatch.setattr(chat_generic, "client", SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create))))
+    trace = tmp_path / "trace.jsonl"
+    profiler = PipelineProfiler(str(trace))
+    chatbot = build_chatbot(profiler, llm=instrument_llm(ChatGeneric(model="test-model"), profiler))
+
+    chatbot.invoke({'messages': [HumanMessage(content="Hi")]}, config={'configurable': {'thread_id': 't3'}})
+
+    [entry] = read_trace(trace)
+    spans = {span['name']: span for span in entry['spans']}
+    llm_call, message_format = spans['llm_call'], spans['message_format']
+    assert llm_call['start_ms'] <= message_format['start_ms']
+    assert message_format['start_ms'] + message_format['duration_ms'] <= llm_call['start_ms'] + llm_call['duration_ms']